@@ -0,0 +1,61 @@
+"""
+Script to add materialized-path columns to comments table
+Adds path/depth, backfills them level by level and creates idx_comment_path
+"""
+from app import create_app
+from models import db
+
+def add_comment_path_columns():
+    """Add path and depth columns to comments table and backfill them"""
+    app = create_app()
+    with app.app_context():
+        try:
+            from sqlalchemy import inspect
+            inspector = inspect(db.engine)
+            columns = [col['name'] for col in inspector.get_columns('comments')]
+            indexes = [index['name'] for index in inspector.get_indexes('comments')]
+            
+            with db.engine.connect() as conn:
+                if 'path' not in columns:
+                    conn.execute(db.text("ALTER TABLE comments ADD COLUMN path VARCHAR(255)"))
+                    print("✓ Added path column")
+                
+                if 'depth' not in columns:
+                    conn.execute(db.text("ALTER TABLE comments ADD COLUMN depth INT DEFAULT 0"))
+                    print("✓ Added depth column")
+                
+                # Root comments first, then one level of replies per pass
+                result = conn.execute(db.text("""
+                    UPDATE comments
+                    SET path = CONCAT(LPAD(id, 10, '0'), '/'), depth = 0
+                    WHERE parent_comment_id IS NULL AND path IS NULL
+                """))
+                print(f"✓ Backfilled {result.rowcount} root comments")
+                
+                level = 1
+                while True:
+                    result = conn.execute(db.text("""
+                        UPDATE comments c
+                        JOIN comments p ON c.parent_comment_id = p.id
+                        SET c.path = CONCAT(p.path, LPAD(c.id, 10, '0'), '/'), c.depth = p.depth + 1
+                        WHERE c.path IS NULL AND p.path IS NOT NULL
+                    """))
+                    if result.rowcount == 0:
+                        break
+                    print(f"✓ Backfilled {result.rowcount} replies at depth {level}")
+                    level += 1
+                
+                if 'idx_comment_path' not in indexes:
+                    conn.execute(db.text("CREATE INDEX idx_comment_path ON comments (post_id, path)"))
+                    print("✓ Added idx_comment_path index")
+                
+                conn.commit()
+            
+            print("\n✅ Database updated successfully!")
+                
+        except Exception as e:
+            print(f"❌ Error updating database: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    add_comment_path_columns()
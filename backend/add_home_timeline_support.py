@@ -0,0 +1,59 @@
+"""
+Script to add home timeline support
+Adds users.friend_count and backfills home_timelines from existing friendships
+"""
+from app import create_app
+from models import db
+
+def add_home_timeline_support():
+    """Add friend_count column and populate home timelines"""
+    app = create_app()
+    with app.app_context():
+        try:
+            from sqlalchemy import inspect
+            inspector = inspect(db.engine)
+            columns = [col['name'] for col in inspector.get_columns('users')]
+            
+            with db.engine.connect() as conn:
+                if 'friend_count' not in columns:
+                    conn.execute(db.text("ALTER TABLE users ADD COLUMN friend_count INT DEFAULT 0"))
+                    print("✓ Added friend_count column")
+                
+                conn.execute(db.text("""
+                    UPDATE users SET friend_count = (
+                        SELECT COUNT(*) FROM friendships
+                        WHERE friendships.user_id = users.id AND friendships.status = 'accepted'
+                    )
+                """))
+                print("✓ Recomputed friend counts")
+                
+                # home_timelines itself is created by db.create_all()
+                conn.execute(db.text("""
+                    INSERT IGNORE INTO home_timelines (user_id, post_id, author_id, created_at)
+                    SELECT p.user_id, p.id, p.user_id, p.created_at
+                    FROM posts p
+                    WHERE p.status = 'published' AND p.is_deleted = FALSE
+                """))
+                conn.execute(db.text("""
+                    INSERT IGNORE INTO home_timelines (user_id, post_id, author_id, created_at)
+                    SELECT f.user_id, p.id, p.user_id, p.created_at
+                    FROM friendships f
+                    JOIN users u ON u.id = f.friend_id
+                    JOIN posts p ON p.user_id = f.friend_id
+                    WHERE f.status = 'accepted'
+                      AND u.friend_count <= :fanout_limit
+                      AND p.status = 'published' AND p.is_deleted = FALSE
+                      AND p.visibility != 'private'
+                """), {'fanout_limit': app.config['TIMELINE_FANOUT_LIMIT']})
+                print("✓ Backfilled home timelines")
+                
+                conn.commit()
+            
+            print("\n✅ Database updated successfully!")
+                
+        except Exception as e:
+            print(f"❌ Error updating database: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    add_home_timeline_support()
@@ -0,0 +1,39 @@
+"""
+Script to replace likes.idx_target with the covering idx_target_likers index
+Run this script to update the database schema
+"""
+from app import create_app
+from models import db
+
+def add_likers_index():
+    """Create idx_target_likers and drop the now redundant idx_target"""
+    app = create_app()
+    with app.app_context():
+        try:
+            from sqlalchemy import inspect
+            inspector = inspect(db.engine)
+            indexes = [index['name'] for index in inspector.get_indexes('likes')]
+            
+            with db.engine.connect() as conn:
+                if 'idx_target_likers' not in indexes:
+                    conn.execute(db.text(
+                        "CREATE INDEX idx_target_likers ON likes (target_type, target_id, created_at, id, user_id)"
+                    ))
+                    print("✓ Added idx_target_likers index")
+                else:
+                    print("ℹ idx_target_likers already exists")
+                
+                if 'idx_target' in indexes:
+                    conn.execute(db.text("DROP INDEX idx_target ON likes"))
+                    print("✓ Dropped idx_target index (prefix of idx_target_likers)")
+                
+                conn.commit()
+            
+            print("\n✅ Database updated successfully!")
+                
+        except Exception as e:
+            print(f"❌ Error updating database: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    add_likers_index()
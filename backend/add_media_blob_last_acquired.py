@@ -0,0 +1,44 @@
+"""
+Script to stop reference counting media blobs
+- Adds last_acquired_at column to media_blobs (backfilled from created_at)
+- Drops the ref_count column
+cleanup_orphaned_uploads collects blobs nothing refers to; last_acquired_at
+keeps content that was uploaded again within the grace period.
+Run this script to update the database schema
+"""
+from app import create_app
+from models import db
+
+def add_media_blob_last_acquired():
+    """Replace media_blobs.ref_count with last_acquired_at"""
+    app = create_app()
+    with app.app_context():
+        try:
+            from sqlalchemy import inspect
+            inspector = inspect(db.engine)
+            columns = [col['name'] for col in inspector.get_columns('media_blobs')]
+            
+            with db.engine.connect() as conn:
+                if 'last_acquired_at' not in columns:
+                    conn.execute(db.text("ALTER TABLE media_blobs ADD COLUMN last_acquired_at DATETIME DEFAULT CURRENT_TIMESTAMP"))
+                    conn.execute(db.text("UPDATE media_blobs SET last_acquired_at = created_at"))
+                    print("✓ Added last_acquired_at column")
+                else:
+                    print("ℹ last_acquired_at column already exists")
+                
+                if 'ref_count' in columns:
+                    conn.execute(db.text("ALTER TABLE media_blobs DROP COLUMN ref_count"))
+                    print("✓ Dropped ref_count column")
+                else:
+                    print("ℹ ref_count column already dropped")
+                
+                conn.commit()
+            
+            print("\n✅ Database updated successfully!")
+        
+        except Exception as e:
+            print(f"❌ Error updating database: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    add_media_blob_last_acquired()
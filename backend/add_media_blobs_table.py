@@ -0,0 +1,32 @@
+"""
+Script to add content-addressed upload storage
+- Creates media_blobs table (one row per distinct file content)
+Existing uploads keep their URLs and are deleted as before (they have no blob row).
+Run this script to update the database schema
+"""
+from app import create_app
+from models import db
+from models.media_blob import MediaBlob
+
+def add_media_blobs_table():
+    """Create media_blobs table"""
+    app = create_app()
+    with app.app_context():
+        try:
+            from sqlalchemy import inspect
+            inspector = inspect(db.engine)
+            
+            if 'media_blobs' not in inspector.get_table_names():
+                print("Creating media_blobs table...")
+                MediaBlob.__table__.create(db.engine)
+                print("✓ Created media_blobs table")
+                print("\n✅ Database updated successfully!")
+            else:
+                print("ℹ media_blobs table already exists")
+                
+        except Exception as e:
+            print(f"❌ Error updating database: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    add_media_blobs_table()
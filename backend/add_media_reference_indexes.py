@@ -0,0 +1,47 @@
+"""
+Script to index the columns that reference uploaded files
+- Adds idx_comment_media_url index to comments table
+- Adds idx_avatar_url index to users table
+Used by cleanup_orphaned_uploads.py to look up batches of file URLs
+Run this script to update the database schema
+"""
+from app import create_app
+from models import db
+
+# (table, index, column)
+INDEXES = [
+    ('comments', 'idx_comment_media_url', 'media_url'),
+    ('users', 'idx_avatar_url', 'avatar_url')
+]
+
+def add_media_reference_indexes():
+    """Index comments.media_url and users.avatar_url"""
+    app = create_app()
+    with app.app_context():
+        try:
+            from sqlalchemy import inspect
+            inspector = inspect(db.engine)
+            
+            for table, index, column in INDEXES:
+                indexes = [existing['name'] for existing in inspector.get_indexes(table)]
+                if index in indexes:
+                    print(f"ℹ {index} already exists on {table} table")
+                    continue
+                
+                print(f"Adding {index} index to {table} table...")
+                with db.engine.connect() as conn:
+                    if db.engine.dialect.name == 'mysql':
+                        conn.execute(db.text(f"CREATE INDEX {index} ON {table} ({column}(255))"))
+                    else:
+                        conn.execute(db.text(f"CREATE INDEX {index} ON {table} ({column})"))
+                    conn.commit()
+                print(f"✓ Added {index} index")
+            
+            print("\n✅ Database updated successfully!")
+                
+        except Exception as e:
+            print(f"❌ Error updating database: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    add_media_reference_indexes()
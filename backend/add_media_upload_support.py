@@ -0,0 +1,48 @@
+"""
+Script to add background media processing support
+- Creates media_uploads table
+- Adds idx_media_url index to post_media table
+Run this script to update the database schema
+"""
+from app import create_app
+from models import db
+from models.media_upload import MediaUpload
+
+def add_media_upload_support():
+    """Create media_uploads and index post_media.media_url"""
+    app = create_app()
+    with app.app_context():
+        try:
+            from sqlalchemy import inspect
+            inspector = inspect(db.engine)
+            
+            if 'media_uploads' not in inspector.get_table_names():
+                print("Creating media_uploads table...")
+                MediaUpload.__table__.create(db.engine)
+                print("✓ Created media_uploads table")
+            else:
+                print("ℹ media_uploads table already exists")
+            
+            indexes = [index['name'] for index in inspector.get_indexes('post_media')]
+            if 'idx_media_url' not in indexes:
+                print("Adding idx_media_url index to post_media table...")
+                
+                with db.engine.connect() as conn:
+                    if db.engine.dialect.name == 'mysql':
+                        conn.execute(db.text("CREATE INDEX idx_media_url ON post_media (media_url(255))"))
+                    else:
+                        conn.execute(db.text("CREATE INDEX idx_media_url ON post_media (media_url)"))
+                    conn.commit()
+                
+                print("✓ Added idx_media_url index")
+            else:
+                print("ℹ idx_media_url already exists on post_media table")
+            
+            print("\n✅ Database updated successfully!")
+                
+        except Exception as e:
+            print(f"❌ Error updating database: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    add_media_upload_support()
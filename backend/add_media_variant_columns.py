@@ -0,0 +1,37 @@
+"""
+Script to add responsive image variant columns
+- post_media.variants
+- media_uploads.variants
+Run this script to update the database schema
+"""
+from app import create_app
+from models import db
+
+def add_media_variant_columns():
+    """Add variants JSON column to post_media and media_uploads tables"""
+    app = create_app()
+    with app.app_context():
+        try:
+            from sqlalchemy import inspect
+            inspector = inspect(db.engine)
+            
+            with db.engine.connect() as conn:
+                for table in ('post_media', 'media_uploads'):
+                    columns = [col['name'] for col in inspector.get_columns(table)]
+                    
+                    if 'variants' not in columns:
+                        conn.execute(db.text(f"ALTER TABLE {table} ADD COLUMN variants JSON"))
+                        print(f"✓ Added variants column to {table}")
+                    else:
+                        print(f"ℹ variants column already exists in {table}")
+                
+                conn.commit()
+            
+            print("\n✅ Database updated successfully!")
+                
+        except Exception as e:
+            print(f"❌ Error updating database: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    add_media_variant_columns()
@@ -0,0 +1,45 @@
+"""
+Script to add distinct actor tracking for aggregated notifications
+- Creates notification_actors table (one row per notification and actor)
+- Backfills it from the latest actor ids kept on aggregated notifications
+Older actors of a current window are not known; they count once more if they act again.
+Run this script to update the database schema
+"""
+from app import create_app
+from models import db
+from models.notification_actor import NotificationActor
+
+def add_notification_actors_table():
+    """Create notification_actors table"""
+    app = create_app()
+    with app.app_context():
+        try:
+            from sqlalchemy import inspect
+            inspector = inspect(db.engine)
+            
+            if 'notification_actors' not in inspector.get_table_names():
+                print("Creating notification_actors table...")
+                NotificationActor.__table__.create(db.engine)
+                print("✓ Created notification_actors table")
+            else:
+                print("ℹ notification_actors table already exists")
+            
+            with db.engine.connect() as conn:
+                conn.execute(db.text("""
+                    INSERT IGNORE INTO notification_actors (notification_id, actor_id, created_at)
+                    SELECT n.id, actors.actor_id, n.updated_at
+                    FROM notifications n,
+                         JSON_TABLE(n.actor_ids, '$[*]' COLUMNS (actor_id BIGINT PATH '$')) actors
+                    WHERE n.group_key IS NOT NULL
+                """))
+                conn.commit()
+                print("✓ Backfilled notification actors")
+            
+            print("\n✅ Database updated successfully!")
+                
+        except Exception as e:
+            print(f"❌ Error updating database: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    add_notification_actors_table()
@@ -0,0 +1,67 @@
+"""
+Script to add notification aggregation support
+- Adds target_id, target_type, actor_count, actor_ids, group_key and updated_at columns to notifications table
+- Adds uq_notification_group and idx_user_notifications_updated indexes
+- Backfills updated_at and actor_ids of existing notifications
+Run this script to update the database schema
+"""
+from app import create_app
+from models import db
+
+# column -> definition
+COLUMNS = {
+    'target_id': 'BIGINT',
+    'target_type': 'VARCHAR(50)',
+    'actor_count': 'INT DEFAULT 1',
+    'actor_ids': 'JSON',
+    'group_key': 'VARCHAR(100)',
+    'updated_at': 'DATETIME'
+}
+
+def add_notification_aggregation():
+    """Add aggregation columns to notifications table"""
+    app = create_app()
+    with app.app_context():
+        try:
+            from sqlalchemy import inspect
+            inspector = inspect(db.engine)
+            columns = [col['name'] for col in inspector.get_columns('notifications')]
+            indexes = [index['name'] for index in inspector.get_indexes('notifications')]
+            indexes += [constraint['name'] for constraint in inspector.get_unique_constraints('notifications')]
+            
+            with db.engine.connect() as conn:
+                for column, definition in COLUMNS.items():
+                    if column not in columns:
+                        conn.execute(db.text(f"ALTER TABLE notifications ADD COLUMN {column} {definition}"))
+                        print(f"✓ Added {column} column")
+                    else:
+                        print(f"ℹ {column} column already exists")
+                
+                conn.execute(db.text("UPDATE notifications SET updated_at = created_at WHERE updated_at IS NULL"))
+                conn.execute(db.text("UPDATE notifications SET actor_count = 1 WHERE actor_count IS NULL"))
+                # related_id is the actor of these types
+                conn.execute(db.text("""
+                    UPDATE notifications SET actor_ids = JSON_ARRAY(related_id)
+                    WHERE actor_ids IS NULL AND related_id IS NOT NULL
+                      AND related_type IN ('like', 'comment', 'share', 'friend_request')
+                """))
+                print("✓ Backfilled updated_at and actor_ids")
+                
+                if 'uq_notification_group' not in indexes:
+                    conn.execute(db.text("CREATE UNIQUE INDEX uq_notification_group ON notifications (user_id, group_key)"))
+                    print("✓ Added uq_notification_group index")
+                
+                if 'idx_user_notifications_updated' not in indexes:
+                    conn.execute(db.text("CREATE INDEX idx_user_notifications_updated ON notifications (user_id, updated_at)"))
+                    print("✓ Added idx_user_notifications_updated index")
+                
+                conn.commit()
+            
+            print("\n✅ Database updated successfully!")
+        
+        except Exception as e:
+            print(f"❌ Error updating database: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    add_notification_aggregation()
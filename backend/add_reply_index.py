@@ -0,0 +1,35 @@
+"""
+Script to add the idx_parent_created index to comments table
+Run this script to update the database schema
+"""
+from app import create_app
+from models import db
+
+def add_reply_index():
+    """Add (parent_comment_id, created_at, id) index used by reply pagination"""
+    app = create_app()
+    with app.app_context():
+        try:
+            from sqlalchemy import inspect
+            inspector = inspect(db.engine)
+            indexes = [index['name'] for index in inspector.get_indexes('comments')]
+            
+            if 'idx_parent_created' not in indexes:
+                print("Adding idx_parent_created index to comments table...")
+                
+                with db.engine.connect() as conn:
+                    conn.execute(db.text(
+                        "CREATE INDEX idx_parent_created ON comments (parent_comment_id, created_at, id)"
+                    ))
+                    conn.commit()
+                
+                print("\n✅ Database updated successfully!")
+            else:
+                print("ℹ idx_parent_created already exists on comments table")
+                
+        except Exception as e:
+            print(f"❌ Error updating database: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    add_reply_index()
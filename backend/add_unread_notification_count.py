@@ -0,0 +1,41 @@
+"""
+Script to add the unread notification counter
+Adds users.unread_notification_count and fills it from the notifications table
+"""
+from app import create_app
+from models import db
+
+def add_unread_notification_count():
+    """Add unread_notification_count column and compute it"""
+    app = create_app()
+    with app.app_context():
+        try:
+            from sqlalchemy import inspect
+            inspector = inspect(db.engine)
+            columns = [col['name'] for col in inspector.get_columns('users')]
+            
+            with db.engine.connect() as conn:
+                if 'unread_notification_count' not in columns:
+                    conn.execute(db.text("ALTER TABLE users ADD COLUMN unread_notification_count INT DEFAULT 0"))
+                    print("✓ Added unread_notification_count column")
+                else:
+                    print("ℹ unread_notification_count column already exists")
+                
+                conn.execute(db.text("""
+                    UPDATE users SET unread_notification_count = (
+                        SELECT COUNT(*) FROM notifications
+                        WHERE notifications.user_id = users.id AND notifications.is_read = FALSE
+                    )
+                """))
+                print("✓ Computed unread notification counts")
+                
+                conn.commit()
+            
+            print("\n✅ Database updated successfully!")
+        
+        except Exception as e:
+            print(f"❌ Error updating database: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    add_unread_notification_count()
@@ -0,0 +1,31 @@
+"""
+Script to add resumable chunked uploads
+- Creates upload_sessions table (chunks are appended to uploads/tmp/<id>.part)
+Run this script to update the database schema
+"""
+from app import create_app
+from models import db
+from models.upload_session import UploadSession
+
+def add_upload_sessions_table():
+    """Create upload_sessions table"""
+    app = create_app()
+    with app.app_context():
+        try:
+            from sqlalchemy import inspect
+            inspector = inspect(db.engine)
+            
+            if 'upload_sessions' not in inspector.get_table_names():
+                print("Creating upload_sessions table...")
+                UploadSession.__table__.create(db.engine)
+                print("✓ Created upload_sessions table")
+                print("\n✅ Database updated successfully!")
+            else:
+                print("ℹ upload_sessions table already exists")
+                
+        except Exception as e:
+            print(f"❌ Error updating database: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    add_upload_sessions_table()
@@ -0,0 +1,43 @@
+"""
+Script to add video transcoding columns
+- post_media.stream_url
+- media_uploads.poster_url / stream_url
+Run this script to update the database schema
+"""
+from app import create_app
+from models import db
+
+COLUMNS = [
+    ('post_media', 'stream_url', 'TEXT'),
+    ('media_uploads', 'poster_url', 'VARCHAR(500)'),
+    ('media_uploads', 'stream_url', 'VARCHAR(500)')
+]
+
+def add_video_stream_columns():
+    """Add HLS stream and poster columns"""
+    app = create_app()
+    with app.app_context():
+        try:
+            from sqlalchemy import inspect
+            inspector = inspect(db.engine)
+            
+            with db.engine.connect() as conn:
+                for table, column, column_type in COLUMNS:
+                    columns = [col['name'] for col in inspector.get_columns(table)]
+                    
+                    if column not in columns:
+                        conn.execute(db.text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"))
+                        print(f"✓ Added {column} column to {table}")
+                    else:
+                        print(f"ℹ {column} column already exists in {table}")
+                
+                conn.commit()
+            
+            print("\n✅ Database updated successfully!")
+                
+        except Exception as e:
+            print(f"❌ Error updating database: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    add_video_stream_columns()
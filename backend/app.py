@@ -4,7 +4,7 @@ import os
 
 from config import config
 from models import db
-from extensions import bcrypt, jwt, mail
+from extensions import bcrypt, jwt, mail, cache, counter_buffer, media_pipeline, storage
 from controllers.auth_controller import auth_bp
 from controllers.user_controller import user_bp
 from controllers.post_controller import post_bp
@@ -12,9 +12,15 @@ from controllers.comment_controller import comment_bp
 from controllers.friend_controller import friend_bp
 from controllers.moderation_controller import moderation_bp
 from controllers.notification_controller import notification_bp
+from controllers.like_controller import like_bp
+from controllers.upload_controller import upload_bp
+from utils.media_serving import send_upload
 
-def create_app(config_name='development'):
-    """Application factory"""
+def create_app(config_name='development', test_config=None):
+    """
+    Application factory
+    test_config: settings applied over the config class (tests)
+    """
     # Set template and static folders to frontend directory
     frontend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'frontend'))
     app = Flask(__name__, 
@@ -22,12 +28,18 @@ def create_app(config_name='development'):
                 static_folder=frontend_dir,
                 static_url_path='')
     app.config.from_object(config[config_name])
+    if test_config:
+        app.config.update(test_config)
     
     # Initialize extensions
     db.init_app(app)
     bcrypt.init_app(app)
     jwt.init_app(app)
     mail.init_app(app)
+    cache.init_app(app)
+    counter_buffer.init_app(app)
+    media_pipeline.init_app(app)
+    storage.init_app(app)
     CORS(app, origins=[app.config.get('FRONTEND_URL', '*')])
     
     # Create tables
@@ -63,12 +75,19 @@ def create_app(config_name='development'):
     app.register_blueprint(friend_bp, url_prefix='/api/friends')
     app.register_blueprint(moderation_bp, url_prefix='/api/moderation')
     app.register_blueprint(notification_bp, url_prefix='/api/notifications')
+    app.register_blueprint(like_bp, url_prefix='/api/likes')
+    app.register_blueprint(upload_bp, url_prefix='/api/uploads')
     
     # Health check endpoint
     @app.route('/api/health')
     def health_check():
         return {'status': 'ok', 'message': 'Server is running'}
     
+    # Cache metrics (hit ratio per worker process)
+    @app.route('/api/metrics/cache')
+    def cache_metrics():
+        return cache.stats()
+    
     # Serve frontend files
     @app.route('/')
     def index():
@@ -86,7 +105,7 @@ def create_app(config_name='development'):
     @app.route('/uploads/<path:filename>')
     def serve_upload(filename):
         uploads_dir = app.config.get('UPLOAD_FOLDER', os.path.join(os.path.dirname(__file__), 'uploads'))
-        return send_from_directory(uploads_dir, filename)
+        return send_upload(uploads_dir, filename)
     
     # Serve static files (CSS, JS, images)
     @app.route('/<path:path>')
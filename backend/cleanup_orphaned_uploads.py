@@ -0,0 +1,341 @@
+"""
+Script to delete uploaded files that nothing refers to anymore
+
+/api/posts/upload-media and /api/posts/comments/upload-media store files
+before any post or comment points at them, so abandoned drafts, failed
+creates and replaced comment media leave files behind. This streams the
+UPLOAD_FOLDER tree with os.scandir and checks the files in batches against
+post_media.media_url, comments.media_url and users.avatar_url (one indexed
+IN query per table and batch). A file is deleted once nothing refers to it
+and it is older than the grace period (file mtime, and the latest upload of
+the same content for deduplicated uploads).
+
+Only the posts/, comments/ and avatars/ folders are walked, and only files
+named the way the app stores uploads are candidates.
+
+A content-addressed blob (<hash>.<ext>) is swept together with the files
+derived from it (<hash>_<width>.<ext>, <hash>_poster.jpg, <hash>_hls/).
+This sweep is what collects blobs (they are not reference-counted): a blob
+uploaded again within the grace period is kept, and its media_blobs row is
+removed compare-and-set on last_acquired_at, so content that is uploaded
+again while the sweep runs is kept as well. Part files of expired
+resumable uploads (tmp/<id>.part) and their sessions are removed as well.
+
+Note: with STORAGE_KEEP_LOCAL disabled, files that only exist in the storage
+bucket are not seen by the walk.
+
+Usage: python cleanup_orphaned_uploads.py [--grace-hours 24] [--batch-size 1000] [--dry-run]
+"""
+import argparse
+import os
+import re
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import delete
+from app import create_app
+from extensions import storage
+from models import db
+from models.comment import Comment
+from models.media_blob import MediaBlob
+from models.media_upload import MediaUpload
+from models.post_media import PostMedia
+from models.upload_session import UploadSession
+from models.user import User
+from utils.media_serving import FINGERPRINTED_NAME
+
+# Columns holding /uploads/... URLs of files in use
+REFERENCE_COLUMNS = [PostMedia.media_url, Comment.media_url, User.avatar_url]
+
+# Folders of UPLOAD_FOLDER the app stores uploads in; nothing else is touched
+UPLOAD_SUBFOLDERS = ('posts', 'comments', 'avatars')
+
+# Directory of files derived from a blob (<hash>_hls/)
+DERIVED_DIR = re.compile(r'^(?P<hash>[0-9a-f]{64})_\w+$')
+
+# Files stored before content addressing (uuid4().hex.<ext>) and temporary
+# files of uploads interrupted while streaming to disk (tempfile tmpXXXXXXXX.part)
+LEGACY_NAME = re.compile(r'^(?:[0-9a-f]{32}\.\w+|tmp\w{8}\.part)$')
+
+# Resumable upload chunks, swept by sweep_upload_sessions
+TMP_DIR = 'tmp'
+
+
+def _mb(size):
+    return f'{size / (1024 * 1024):.1f}MB'
+
+
+def _tree_files(directory):
+    """(path, size, mtime) of every file under directory, and its subdirectories deepest first"""
+    files, dirs = [], []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                sub_files, sub_dirs = _tree_files(entry.path)
+                files.extend(sub_files)
+                dirs.extend(sub_dirs)
+            elif entry.is_file(follow_symlinks=False):
+                stat = entry.stat(follow_symlinks=False)
+                files.append((entry.path, stat.st_size, stat.st_mtime))
+    dirs.append(directory)
+    return files, dirs
+
+
+def iter_file_groups(upload_root):
+    """
+    Stream the upload folders as groups of files that are kept or deleted together:
+    a blob with its derived files, or a single legacy file. Files whose names
+    the app never writes (dotfiles, anything else) are not candidates.
+    Yields: (content_hash or None, url or None, [(path, size, mtime)], [directories])
+    """
+    pending = [
+        os.path.join(upload_root, folder) for folder in UPLOAD_SUBFOLDERS
+        if os.path.isdir(os.path.join(upload_root, folder))
+    ]
+    while pending:
+        directory = pending.pop()
+        blobs = {}
+        
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                relative = os.path.relpath(entry.path, upload_root).replace(os.sep, '/')
+                
+                if entry.is_dir(follow_symlinks=False):
+                    match = DERIVED_DIR.match(entry.name)
+                    if match:
+                        files, dirs = _tree_files(entry.path)
+                        group = blobs.setdefault(match.group('hash'), {'url': None, 'files': [], 'dirs': []})
+                        group['files'].extend(files)
+                        group['dirs'].extend(dirs)
+                    else:
+                        pending.append(entry.path)
+                    continue
+                
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                
+                stat = entry.stat(follow_symlinks=False)
+                file = (entry.path, stat.st_size, stat.st_mtime)
+                match = FINGERPRINTED_NAME.search(relative)
+                if match:
+                    group = blobs.setdefault(match.group('hash'), {'url': None, 'files': [], 'dirs': []})
+                    group['files'].append(file)
+                    if not match.group('variant'):
+                        group['url'] = f'/uploads/{relative}'
+                elif LEGACY_NAME.match(entry.name):
+                    yield None, f'/uploads/{relative}', [file], []
+        
+        # Derived files always sit next to their blob, so the group is complete here
+        for content_hash, group in blobs.items():
+            yield content_hash, group['url'], group['files'], group['dirs']
+
+
+def sweep_batch(groups, cutoff, created_before, dry_run, stats):
+    """
+    Delete the unreferenced groups of one batch whose files are all older than
+    cutoff (epoch seconds), with the upload records created before created_before
+    """
+    hashes = [content_hash for content_hash, _, _, _ in groups if content_hash]
+    blobs = {}
+    if hashes:
+        blobs = {
+            row.content_hash: row
+            for row in db.session.query(
+                MediaBlob.id, MediaBlob.content_hash, MediaBlob.media_url, MediaBlob.last_acquired_at
+            ).filter(MediaBlob.content_hash.in_(hashes))
+        }
+    
+    candidates = {}
+    for content_hash, url, files, dirs in groups:
+        blob = blobs.get(content_hash)
+        urls = {url, blob.media_url if blob else None} - {None}
+        if urls:
+            candidates[content_hash or url] = urls
+    
+    all_urls = set().union(*candidates.values()) if candidates else set()
+    referenced = set()
+    if all_urls:
+        for column in REFERENCE_COLUMNS:
+            referenced.update(value for (value,) in db.session.query(column).filter(column.in_(all_urls)))
+        
+        # Content uploaded again within the grace period (a deduplicated upload keeps the old mtime)
+        referenced.update(
+            value for (value,) in db.session.query(MediaUpload.media_url).filter(
+                MediaUpload.media_url.in_(all_urls),
+                MediaUpload.created_at >= created_before
+            )
+        )
+    
+    removed_urls = []
+    for content_hash, url, files, dirs in groups:
+        urls = candidates.get(content_hash or url, set())
+        if urls & referenced or max(mtime for _, _, mtime in files) >= cutoff:
+            continue
+        
+        blob = blobs.get(content_hash)
+        if blob and blob.last_acquired_at and blob.last_acquired_at >= created_before:
+            continue
+        if blob and not dry_run:
+            # A new upload of the same content moves last_acquired_at and keeps the blob
+            removed = db.session.execute(
+                delete(MediaBlob).where(
+                    MediaBlob.id == blob.id,
+                    MediaBlob.last_acquired_at == blob.last_acquired_at
+                )
+            ).rowcount
+            if not removed:
+                continue
+        
+        for path, size, _ in files:
+            if not dry_run:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+            stats['deleted'] += 1
+            stats['reclaimed'] += size
+        
+        if not dry_run:
+            for directory in dirs:
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    pass
+        
+        removed_urls.extend(urls)
+    
+    if removed_urls and not dry_run:
+        # Upload records of the deleted drafts
+        db.session.execute(
+            delete(MediaUpload).where(
+                MediaUpload.media_url.in_(removed_urls),
+                MediaUpload.created_at < created_before
+            )
+        )
+    
+    db.session.commit()
+    
+    if not dry_run:
+        for url in removed_urls:
+            storage.remove(url)
+
+
+def sweep_uploads(upload_root, grace, batch_size=1000, dry_run=False):
+    """Walk UPLOAD_FOLDER and delete orphaned files older than grace (timedelta). Returns stats"""
+    cutoff = time.time() - grace.total_seconds()
+    created_before = datetime.utcnow() - grace
+    stats = {'files': 0, 'bytes': 0, 'deleted': 0, 'reclaimed': 0}
+    batch = []
+    
+    for group in iter_file_groups(upload_root):
+        stats['files'] += len(group[2])
+        stats['bytes'] += sum(size for _, size, _ in group[2])
+        batch.append(group)
+        
+        if len(batch) >= batch_size:
+            sweep_batch(batch, cutoff, created_before, dry_run, stats)
+            batch = []
+    
+    if batch:
+        sweep_batch(batch, cutoff, created_before, dry_run, stats)
+    
+    return stats
+
+
+def sweep_upload_sessions(upload_root, expired_before, batch_size=1000, dry_run=False):
+    """
+    Delete part files of resumable uploads that expired or have no session
+    left, and the expired sessions. Returns stats
+    """
+    stats = {'files': 0, 'bytes': 0, 'deleted': 0, 'reclaimed': 0, 'sessions': 0}
+    tmp_dir = os.path.join(upload_root, TMP_DIR)
+    cutoff = (expired_before - datetime(1970, 1, 1)).total_seconds()
+    
+    def sweep(parts):
+        sessions = dict(
+            db.session.query(UploadSession.id, UploadSession.updated_at).filter(UploadSession.id.in_(parts))
+        )
+        for session_id, (path, size, mtime) in parts.items():
+            updated_at = sessions.get(session_id)
+            expired = updated_at < expired_before if updated_at else mtime < cutoff
+            if not expired:
+                continue
+            if not dry_run:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+            stats['deleted'] += 1
+            stats['reclaimed'] += size
+    
+    if os.path.isdir(tmp_dir):
+        parts = {}
+        with os.scandir(tmp_dir) as entries:
+            for entry in entries:
+                if not entry.is_file(follow_symlinks=False) or not entry.name.endswith('.part'):
+                    continue
+                stat = entry.stat(follow_symlinks=False)
+                parts[entry.name[:-len('.part')]] = (entry.path, stat.st_size, stat.st_mtime)
+                stats['files'] += 1
+                stats['bytes'] += stat.st_size
+                
+                if len(parts) >= batch_size:
+                    sweep(parts)
+                    parts = {}
+        
+        if parts:
+            sweep(parts)
+    
+    expired = UploadSession.query.filter(
+        UploadSession.status == 'uploading',
+        UploadSession.updated_at < expired_before
+    )
+    if dry_run:
+        stats['sessions'] = expired.count()
+    else:
+        stats['sessions'] = expired.delete(synchronize_session=False)
+    db.session.commit()
+    
+    return stats
+
+
+def cleanup_orphaned_uploads(grace_hours=24, batch_size=1000, dry_run=False):
+    """Delete orphaned uploads and expired resumable upload chunks"""
+    app = create_app()
+    with app.app_context():
+        try:
+            upload_root = app.config['UPLOAD_FOLDER']
+            action = 'would delete' if dry_run else 'deleted'
+            
+            started = time.monotonic()
+            stats = sweep_uploads(upload_root, timedelta(hours=grace_hours), batch_size, dry_run)
+            storage.shutdown()
+            elapsed = max(time.monotonic() - started, 1e-6)
+            print(f"✓ uploads: scanned {stats['files']} files ({_mb(stats['bytes'])}) in {elapsed:.1f}s "
+                  f"({stats['files'] / elapsed:.0f} files/s, {_mb(stats['bytes'] / elapsed)}/s), "
+                  f"{action} {stats['deleted']} files, reclaimed {_mb(stats['reclaimed'])}")
+            
+            started = time.monotonic()
+            ttl = timedelta(hours=app.config.get('UPLOAD_SESSION_TTL_HOURS', 24))
+            stats = sweep_upload_sessions(upload_root, datetime.utcnow() - ttl, batch_size, dry_run)
+            print(f"✓ resumable uploads: scanned {stats['files']} part files in {time.monotonic() - started:.1f}s, "
+                  f"{action} {stats['deleted']} part files and {stats['sessions']} expired sessions, "
+                  f"reclaimed {_mb(stats['reclaimed'])}")
+            
+            print("\n✅ Orphaned upload cleanup finished!")
+        
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Error cleaning up uploads: {str(e)}")
+            raise
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Delete uploaded files that nothing refers to')
+    parser.add_argument('--grace-hours', type=float, default=24, help='Keep files younger than this')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Files checked per database round trip')
+    parser.add_argument('--dry-run', action='store_true', help='Report without deleting')
+    args = parser.parse_args()
+    
+    cleanup_orphaned_uploads(args.grace_hours, args.batch_size, args.dry_run)
@@ -26,6 +26,15 @@ class Config:
     # File Upload
     UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads')
     MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 100MB
+    
+    # Resumable uploads (/api/uploads): larger files are sent in chunks
+    RESUMABLE_CHUNK_SIZE = 5 * 1024 * 1024  # Suggested chunk size for clients
+    UPLOAD_SESSION_TTL_HOURS = 24  # Unfinished uploads expire after this much inactivity
+    
+    # Let the web server stream /uploads: '' (Python serves files), 'x-sendfile' (Apache/lighttpd)
+    # or 'x-accel' (nginx, internal location MEDIA_ACCEL_PREFIX aliased to UPLOAD_FOLDER)
+    MEDIA_OFFLOAD = os.getenv('MEDIA_OFFLOAD', '')
+    MEDIA_ACCEL_PREFIX = '/protected-uploads/'
     ALLOWED_IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
     ALLOWED_VIDEO_EXTENSIONS = {'mp4', 'avi', 'mov'}
     
@@ -34,6 +43,16 @@ class Config:
     AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
     AWS_S3_BUCKET = os.getenv('AWS_S3_BUCKET')
     AWS_REGION = os.getenv('AWS_REGION', 'us-east-1')
+    AWS_S3_ENDPOINT_URL = os.getenv('AWS_S3_ENDPOINT_URL')  # S3-compatible servers (MinIO, ...)
+    
+    # Media storage: 'local' (UPLOAD_FOLDER) or 's3' (copied to AWS_S3_BUCKET in the background)
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'local')
+    STORAGE_PUBLIC_URL = os.getenv('STORAGE_PUBLIC_URL')  # CDN / bucket URL that /uploads redirects to
+    STORAGE_KEEP_LOCAL = os.getenv('STORAGE_KEEP_LOCAL', 'true').lower() == 'true'
+    STORAGE_WORKERS = 4  # Background upload/delete threads
+    STORAGE_MULTIPART_THRESHOLD = 8 * 1024 * 1024  # Files above this use multipart uploads
+    STORAGE_MULTIPART_CHUNK_SIZE = 8 * 1024 * 1024
+    STORAGE_MAX_CONCURRENCY = 8  # Parallel parts per file
     
     # Email
     MAIL_SERVER = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
@@ -52,6 +71,29 @@ class Config:
     # Redis (for caching and Celery)
     REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
     
+    # Feed/post cache: 'memory' (in-process LRU), 'redis' or 'none'
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+    CACHE_DEFAULT_TTL = 30  # seconds
+    CACHE_MAX_ENTRIES = 1024
+    
+    # Write-behind like/comment/share counters (flushed in bulk every interval)
+    COUNTER_WRITE_BEHIND = os.getenv('COUNTER_WRITE_BEHIND', 'true').lower() == 'true'
+    COUNTER_FLUSH_INTERVAL_MS = 500
+    
+    # Uploaded images are resized/re-encoded in a process pool instead of the request
+    MEDIA_ASYNC_PROCESSING = os.getenv('MEDIA_ASYNC_PROCESSING', 'true').lower() == 'true'
+    MEDIA_WORKERS = int(os.getenv('MEDIA_WORKERS', 2))
+    MEDIA_MAX_PENDING = 32  # Queued jobs before falling back to inline processing
+    MEDIA_VARIANT_WIDTHS = (320, 640, 1280, 1920)  # Responsive image ladder (WebP + JPEG)
+    
+    # Video transcoding to HLS (skipped when ffmpeg/ffprobe are not installed)
+    MEDIA_FFMPEG = os.getenv('MEDIA_FFMPEG', 'ffmpeg')
+    MEDIA_FFPROBE = os.getenv('MEDIA_FFPROBE', 'ffprobe')
+    MEDIA_HLS_RENDITIONS = ((360, 800), (720, 2800))  # (height, video kbps)
+    MEDIA_TRANSCODE_TIMEOUT = 1800  # seconds per ffmpeg run
+    MEDIA_TRANSCODE_WORKERS = int(os.getenv('MEDIA_TRANSCODE_WORKERS', 1))  # Own pool, image jobs never wait behind videos
+    MEDIA_MAX_PENDING_TRANSCODES = 4  # Queued videos before new ones are kept as uploaded
+    
     # Celery
     CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
     CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
@@ -67,6 +109,14 @@ class Config:
     SOFT_DELETE_RETENTION_DAYS = 30
     MAX_APPEALS_PER_VIOLATION = 1
     APPEAL_DEADLINE_DAYS = 7
+    
+    # Home timeline (fan-out-on-write)
+    TIMELINE_FANOUT_LIMIT = 1000  # Authors with more friends are merged in at read time
+    TIMELINE_BACKFILL_POSTS = 50  # Recent posts copied when a friendship is accepted
+    
+    # Notification aggregation ("A and 24 others liked your post")
+    NOTIFICATION_AGGREGATE_WINDOW_HOURS = 24  # Same (user, type, target) within a window share one row
+    NOTIFICATION_LATEST_ACTORS = 5  # Actor ids kept on an aggregated notification
 
 class DevelopmentConfig(Config):
     """Development configuration"""
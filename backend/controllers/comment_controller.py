@@ -7,11 +7,19 @@ from models.user import User
 from models.like import Like
 from datetime import datetime, timezone, timedelta
 import os
-from werkzeug.utils import secure_filename
-from PIL import Image
+from sqlalchemy import func
+from utils.cache import invalidate_post
+from extensions import counter_buffer
+from controllers.like_controller import get_likers_page
+from controllers.post_controller import submit_media_upload
+from utils.pagination import apply_keyset, encode_cursor, keyset_page
 
 comment_bp = Blueprint('comment', __name__)
 
+REPLY_PREVIEW_LIMIT = 3
+COMMENT_MEDIA_MAX_REQUEST = 51 * 1024 * 1024  # Largest comment media (50MB video) plus multipart overhead
+THREAD_MAX_NODES = 500
+
 @comment_bp.route('/posts/<int:post_id>/comments', methods=['POST'])
 @jwt_required()
 def create_comment(post_id):
@@ -38,21 +46,33 @@ def create_comment(post_id):
         # TODO: AI moderation for comment (Phase 5)
         # Check for banned keywords in real-time
         
+        parent = None
+        if data.get('parent_comment_id'):
+            parent = Comment.query.get(data['parent_comment_id'])
+            if not parent or parent.post_id != post_id:
+                return jsonify({'error': 'Parent comment not found'}), 404
+            if parent.path and parent.depth >= Comment.MAX_DEPTH:
+                return jsonify({'error': 'Reply is nested too deeply'}), 400
+        
         new_comment = Comment(
             post_id=post_id,
             user_id=current_user_id,
-            parent_comment_id=data.get('parent_comment_id'),
+            parent_comment_id=parent.id if parent else None,
             content=data['content'],
             media_url=data.get('media_url'),
             media_type=data.get('media_type')
         )
         
         db.session.add(new_comment)
+        db.session.flush()  # Get comment ID for the materialized path
+        if not parent or parent.path:
+            new_comment.set_path(parent)
         
         # Update post comment count
-        post.comment_count += 1
+        counter_buffer.add('post', post_id, 'comment_count', 1)
         
         db.session.commit()
+        invalidate_post(post_id)
         
         return jsonify({
             'message': 'Comment added successfully',
@@ -67,11 +87,15 @@ def create_comment(post_id):
 @comment_bp.route('/posts/<int:post_id>/comments', methods=['GET'])
 @jwt_required()
 def get_comments(post_id):
-    """Lấy danh sách comment của bài viết"""
+    """
+    Lấy danh sách comment của bài viết
+    Query params: page, per_page, replies_limit (số reply xem trước cho mỗi comment)
+    """
     try:
         current_user_id = get_jwt_identity()
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
+        replies_limit = min(request.args.get('replies_limit', REPLY_PREVIEW_LIMIT, type=int), 20)
         
         post = Post.query.get(post_id)
         if not post or post.is_deleted:
@@ -82,22 +106,57 @@ def get_comments(post_id):
             .order_by(Comment.created_at.desc())\
             .paginate(page=page, per_page=per_page, error_out=False)
         
-        # Get user's likes for these comments
-        comment_ids = [c.id for c in comments.items]
-        user_likes = set()
-        if comment_ids:
-            likes = Like.query.filter(
-                Like.user_id == current_user_id,
-                Like.target_type == 'comment',
-                Like.target_id.in_(comment_ids)
-            ).all()
-            user_likes = {like.target_id for like in likes}
+        root_ids = [c.id for c in comments.items]
+        replies = []
+        reply_counts = {}
+        
+        if root_ids and replies_limit > 0:
+            # First K replies of every root in one windowed query
+            row_number = func.row_number().over(
+                partition_by=Comment.parent_comment_id,
+                order_by=(Comment.created_at.asc(), Comment.id.asc())
+            ).label('row_number')
+            ranked = db.session.query(Comment.id.label('id'), row_number).filter(
+                Comment.parent_comment_id.in_(root_ids),
+                Comment.is_blocked == False
+            ).subquery()
+            replies = Comment.query.join(ranked, ranked.c.id == Comment.id)\
+                .filter(ranked.c.row_number <= replies_limit)\
+                .order_by(Comment.parent_comment_id, Comment.created_at.asc(), Comment.id.asc()).all()
+        
+        if root_ids:
+            reply_counts = dict(
+                db.session.query(Comment.parent_comment_id, func.count(Comment.id)).filter(
+                    Comment.parent_comment_id.in_(root_ids),
+                    Comment.is_blocked == False
+                ).group_by(Comment.parent_comment_id).all()
+            )
+        
+        # Authors and liked state for roots and replies together
+        all_comments = comments.items + replies
+        serialized = dict(zip([c.id for c in all_comments], Comment.bulk_to_dict(all_comments)))
+        user_likes = Like.liked_target_ids(current_user_id, 'comment', serialized.keys())
+        for comment_id, comment_dict in serialized.items():
+            comment_dict['is_liked'] = comment_id in user_likes
+        
+        replies_by_root = {root_id: [] for root_id in root_ids}
+        for reply in replies:
+            replies_by_root[reply.parent_comment_id].append(reply)
         
-        # Add is_liked to each comment
         comments_data = []
         for comment in comments.items:
-            comment_dict = comment.to_dict(include_replies=True)
-            comment_dict['is_liked'] = comment.id in user_likes
+            comment_dict = serialized[comment.id]
+            shown = replies_by_root[comment.id]
+            reply_count = reply_counts.get(comment.id, 0)
+            
+            comment_dict['replies'] = [serialized[reply.id] for reply in shown]
+            comment_dict['reply_count'] = reply_count
+            comment_dict['has_more_replies'] = reply_count > len(shown)
+            # Continue with GET /posts/comments/<id>/replies?cursor=...
+            comment_dict['replies_next_cursor'] = (
+                encode_cursor(shown[-1].created_at, shown[-1].id)
+                if shown and reply_count > len(shown) else None
+            )
             comments_data.append(comment_dict)
         
         return jsonify({
@@ -116,7 +175,7 @@ def get_comments(post_id):
 def delete_comment(comment_id):
     """Xóa comment - Chỉ người viết comment hoặc chủ bài viết mới được xóa"""
     try:
-        current_user_id = get_jwt_identity()
+        current_user_id = int(get_jwt_identity())
         comment = Comment.query.get(comment_id)
         
         if not comment:
@@ -131,11 +190,27 @@ def delete_comment(comment_id):
         if comment.user_id != current_user_id and post.user_id != current_user_id:
             return jsonify({'error': 'Unauthorized. Only comment author or post owner can delete'}), 403
         
-        # Update post comment count
-        post.comment_count -= 1
+        if comment.path:
+            # Remove the whole subtree with set-based statements on idx_comment_path
+            subtree = comment.subtree_query()
+            subtree_ids = subtree.with_entities(Comment.id)
+            removed = subtree.count()
+            
+            Like.query.filter(
+                Like.target_type == 'comment',
+                Like.target_id.in_(subtree_ids.scalar_subquery())
+            ).delete(synchronize_session=False)
+            subtree.delete(synchronize_session=False)
+        else:
+            # Comments created before paths were backfilled
+            removed = 1
+            db.session.delete(comment)
+        
+        # Update post comment count (replies are removed with their parent)
+        counter_buffer.add('post', post.id, 'comment_count', -removed)
         
-        db.session.delete(comment)
         db.session.commit()
+        invalidate_post(post.id)
         
         return jsonify({'message': 'Comment deleted successfully'}), 200
         
@@ -203,6 +278,10 @@ def upload_comment_media():
         if not user or not user.is_active():
             return jsonify({'error': 'Account is restricted'}), 403
         
+        # Reject oversized bodies before Werkzeug parses (and buffers) the multipart upload
+        if request.content_length and request.content_length > COMMENT_MEDIA_MAX_REQUEST:
+            return jsonify({'error': f'File too large. Maximum size: {COMMENT_MEDIA_MAX_REQUEST // (1024*1024)}MB'}), 413
+        
         if 'file' not in request.files:
             print("ERROR: No file in request.files")
             return jsonify({'error': 'No file provided'}), 400
@@ -239,46 +318,15 @@ def upload_comment_media():
         if file_size > max_size:
             return jsonify({'error': f'File too large. Maximum size: {max_size // (1024*1024)}MB'}), 400
         
-        # Create upload directory
-        upload_folder = os.path.join('uploads', 'comments', media_type + 's')
-        os.makedirs(upload_folder, exist_ok=True)
-        
-        # Generate unique filename
-        timestamp = get_vietnam_time().strftime('%Y%m%d_%H%M%S')
-        filename = f"{current_user_id}_{timestamp}_{secure_filename(file.filename)}"
-        filepath = os.path.join(upload_folder, filename)
-        
-        # Save file
-        if media_type == 'image':
-            # Optimize image
-            image = Image.open(file)
-            
-            # Convert RGBA to RGB if necessary
-            if image.mode in ('RGBA', 'LA', 'P'):
-                background = Image.new('RGB', image.size, (255, 255, 255))
-                if image.mode == 'P':
-                    image = image.convert('RGBA')
-                background.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
-                image = background
-            
-            # Resize if too large
-            max_dimension = 1920
-            if image.width > max_dimension or image.height > max_dimension:
-                image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
-            
-            # Save optimized image
-            image.save(filepath, 'JPEG', quality=85, optimize=True)
-        else:
-            # Save video directly
-            file.save(filepath)
-        
-        # Return URL
-        url = f'/uploads/comments/{media_type}s/{filename}'
+        # Save file, resize/re-encode in the background
+        upload = submit_media_upload(user.id, file, media_type, f'comments/{media_type}s', variants=False)
         
         return jsonify({
-            'url': url,
-            'type': media_type
-        }), 200
+            'url': upload.media_url,
+            'type': media_type,
+            'media_id': upload.id,
+            'status': upload.status
+        }), 202 if upload.status == 'processing' else 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -289,7 +337,7 @@ def upload_comment_media():
 def like_comment(comment_id):
     """Like/Unlike a comment"""
     try:
-        current_user_id = get_jwt_identity()
+        current_user_id = int(get_jwt_identity())
         user = User.query.get(current_user_id)
         
         if not user or not user.is_active():
@@ -299,34 +347,15 @@ def like_comment(comment_id):
         if not comment or comment.is_blocked:
             return jsonify({'error': 'Comment not found'}), 404
         
-        # Check if already liked
-        existing_like = Like.query.filter_by(
-            user_id=current_user_id,
-            target_type='comment',
-            target_id=comment_id
-        ).first()
-        
-        if existing_like:
-            # Unlike
-            db.session.delete(existing_like)
-            comment.like_count = max(0, comment.like_count - 1)
-            action = 'unliked'
-        else:
-            # Like
-            new_like = Like(
-                user_id=current_user_id,
-                target_type='comment',
-                target_id=comment_id
-            )
-            db.session.add(new_like)
-            comment.like_count += 1
-            action = 'liked'
+        # Atomic toggle: like_count is adjusted in SQL from the affected row count
+        is_liked, _ = Like.toggle(current_user_id, 'comment', comment_id)
+        action = 'liked' if is_liked else 'unliked'
         
         db.session.commit()
         
         return jsonify({
             'message': f'Comment {action}',
-            'like_count': comment.like_count,
+            'like_count': counter_buffer.current('comment', comment_id, 'like_count', comment.like_count),
             'is_liked': action == 'liked'
         }), 200
         
@@ -335,45 +364,119 @@ def like_comment(comment_id):
         return jsonify({'error': str(e)}), 500
 
 
+@comment_bp.route('/posts/comments/<int:comment_id>/thread', methods=['GET'])
+@jwt_required()
+def get_comment_thread(comment_id):
+    """
+    Lấy cả cây reply của một comment đến độ sâu depth
+    Query params: depth (mặc định 3)
+    One range scan on idx_comment_path, nested in memory.
+    """
+    try:
+        current_user_id = get_jwt_identity()
+        depth = max(0, min(request.args.get('depth', 3, type=int), Comment.MAX_DEPTH))
+        
+        comment = Comment.query.get(comment_id)
+        if not comment or comment.is_blocked:
+            return jsonify({'error': 'Comment not found'}), 404
+        
+        if not comment.path:
+            return jsonify({'error': 'Comment thread is not available yet'}), 409
+        
+        # Path order is a pre-order walk: every parent comes before its replies
+        nodes = comment.subtree_query(max_depth=depth)\
+            .filter(Comment.is_blocked == False)\
+            .order_by(Comment.path)\
+            .limit(THREAD_MAX_NODES + 1).all()
+        truncated = len(nodes) > THREAD_MAX_NODES
+        nodes = nodes[:THREAD_MAX_NODES]
+        
+        user_likes = Like.liked_target_ids(current_user_id, 'comment', [node.id for node in nodes])
+        
+        by_id = {}
+        root = None
+        for node, node_dict in zip(nodes, Comment.bulk_to_dict(nodes)):
+            node_dict['is_liked'] = node.id in user_likes
+            node_dict['replies'] = []
+            by_id[node.id] = node_dict
+            if node.id == comment.id:
+                root = node_dict
+            elif node.parent_comment_id in by_id:
+                by_id[node.parent_comment_id]['replies'].append(node_dict)
+        
+        return jsonify({
+            'comment': root,
+            'depth': depth,
+            'truncated': truncated
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@comment_bp.route('/posts/comments/<int:comment_id>/likes', methods=['GET'])
+@jwt_required()
+def get_comment_likes(comment_id):
+    """
+    Danh sách người đã thích comment
+    Query params: cursor, per_page
+    """
+    try:
+        comment = Comment.query.get(comment_id)
+        if not comment or comment.is_blocked:
+            return jsonify({'error': 'Comment not found'}), 404
+        
+        return get_likers_page('comment', comment_id)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @comment_bp.route('/posts/comments/<int:comment_id>/replies', methods=['GET'])
 @jwt_required()
 def get_comment_replies(comment_id):
-    """Get all replies for a comment"""
+    """
+    Get replies for a comment (oldest first, cursor-paginated)
+    Query params: cursor, per_page, include_total
+    """
     try:
         current_user_id = get_jwt_identity()
+        per_page = min(request.args.get('per_page', 20, type=int), 100)
+        cursor = request.args.get('cursor')
+        include_total = request.args.get('include_total', 'false').lower() == 'true'
         
         comment = Comment.query.get(comment_id)
         if not comment:
             return jsonify({'error': 'Comment not found'}), 404
         
-        # Get all replies
-        replies = Comment.query.filter_by(
+        # Seek on idx_parent_created (parent_comment_id, created_at, id)
+        query = Comment.query.filter_by(
             parent_comment_id=comment_id,
             is_blocked=False
-        ).order_by(Comment.created_at.asc()).all()
-        
-        # Get user's likes for these replies
-        reply_ids = [r.id for r in replies]
-        user_likes = set()
-        if reply_ids:
-            likes = Like.query.filter(
-                Like.user_id == current_user_id,
-                Like.target_type == 'comment',
-                Like.target_id.in_(reply_ids)
-            ).all()
-            user_likes = {like.target_id for like in likes}
+        )
+        try:
+            page_query = apply_keyset(query, Comment.created_at, Comment.id, cursor, descending=False)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        replies_data = []
-        for reply in replies:
-            reply_dict = reply.to_dict()
-            reply_dict['is_liked'] = reply.id in user_likes
-            replies_data.append(reply_dict)
+        replies, next_cursor = keyset_page(page_query, per_page)
         
-        return jsonify({
+        # Get user's likes for this page of replies
+        user_likes = Like.liked_target_ids(current_user_id, 'comment', [r.id for r in replies])
+        
+        replies_data = Comment.bulk_to_dict(replies)
+        for reply_dict in replies_data:
+            reply_dict['is_liked'] = reply_dict['id'] in user_likes
+        
+        result = {
             'replies': replies_data,
-            'total': len(replies_data)
-        }), 200
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }
+        if include_total:
+            result['total'] = query.count()
+        
+        return jsonify(result), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-
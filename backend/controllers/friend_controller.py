@@ -3,6 +3,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import db
 from models.friendship import Friendship
 from models.user import User
+from utils.timeline import on_friendship_accepted, on_friendship_removed
 
 friend_bp = Blueprint('friend', __name__)
 
@@ -88,6 +89,9 @@ def accept_friend_request(requester_id):
         friendship1.status = 'accepted'
         friendship2.status = 'accepted'
         
+        # Update friend counts and backfill home timelines
+        on_friendship_accepted(int(current_user_id), requester_id)
+        
         db.session.commit()
         
         return jsonify({'message': 'Friend request accepted'}), 200
@@ -178,12 +182,21 @@ def unfriend(friend_id):
     try:
         current_user_id = get_jwt_identity()
         
+        was_friends = Friendship.query.filter_by(
+            user_id=current_user_id,
+            friend_id=friend_id,
+            status='accepted'
+        ).first() is not None
+        
         # Delete both friendship records
         Friendship.query.filter(
             ((Friendship.user_id == current_user_id) & (Friendship.friend_id == friend_id)) |
             ((Friendship.user_id == friend_id) & (Friendship.friend_id == current_user_id))
         ).delete()
         
+        if was_friends:
+            on_friendship_removed(int(current_user_id), friend_id)
+        
         db.session.commit()
         
         return jsonify({'message': 'Unfriended successfully'}), 200
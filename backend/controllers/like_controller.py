@@ -0,0 +1,98 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import db
+from models.like import Like
+from models.user import User
+from utils.pagination import apply_keyset, keyset_page
+
+like_bp = Blueprint('like', __name__)
+
+LIKE_TARGET_TYPES = ('post', 'comment')
+MAX_STATUS_TARGETS = 500
+
+@like_bp.route('/status', methods=['POST'])
+@jwt_required()
+def get_like_status():
+    """
+    Kiểm tra trạng thái đã thích cho nhiều đối tượng cùng lúc
+    Body: {targets: [{target_type: 'post'|'comment', target_id}]}
+    """
+    try:
+        current_user_id = int(get_jwt_identity())
+        data = request.get_json() or {}
+        targets = data.get('targets')
+        
+        if not isinstance(targets, list):
+            return jsonify({'error': 'targets must be a list'}), 400
+        
+        if len(targets) > MAX_STATUS_TARGETS:
+            return jsonify({'error': f'Too many targets. Maximum: {MAX_STATUS_TARGETS}'}), 400
+        
+        pairs = []
+        for target in targets:
+            if not isinstance(target, dict) or target.get('target_type') not in LIKE_TARGET_TYPES:
+                return jsonify({'error': 'Invalid target_type'}), 400
+            try:
+                pairs.append((target['target_type'], int(target.get('target_id'))))
+            except (TypeError, ValueError):
+                return jsonify({'error': 'Invalid target_id'}), 400
+        
+        liked = Like.liked_targets(current_user_id, pairs)
+        
+        return jsonify({
+            'statuses': [
+                {
+                    'target_type': target_type,
+                    'target_id': target_id,
+                    'is_liked': (target_type, target_id) in liked
+                }
+                for target_type, target_id in pairs
+            ]
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def get_likers_page(target_type, target_id):
+    """
+    Cursor-paginated list of users who liked a target (newest first)
+    Query params: cursor, per_page
+    One joined query; the likes side is read from idx_target_likers only.
+    """
+    per_page = min(request.args.get('per_page', 20, type=int), 100)
+    cursor = request.args.get('cursor')
+    
+    query = db.session.query(
+        Like.id.label('like_id'),
+        Like.created_at.label('liked_at'),
+        User.id,
+        User.username,
+        User.full_name,
+        User.avatar_url
+    ).join(User, User.id == Like.user_id).filter(
+        Like.target_type == target_type,
+        Like.target_id == target_id
+    )
+    
+    try:
+        query = apply_keyset(query, Like.created_at, Like.id, cursor)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    rows, next_cursor = keyset_page(query, per_page, created_attr='liked_at', id_attr='like_id')
+    
+    return jsonify({
+        'users': [
+            {
+                'id': row.id,
+                'username': row.username,
+                'full_name': row.full_name,
+                'avatar_url': row.avatar_url,
+                'liked_at': row.liked_at.isoformat() if row.liked_at else None
+            }
+            for row in rows
+        ],
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None
+    }), 200
@@ -6,6 +6,8 @@ from models.post import Post
 from models.user import User
 from models.appeal import Appeal
 from datetime import datetime
+from utils.timeline import fan_out_post
+from utils.cache import invalidate_post
 
 moderation_bp = Blueprint('moderation', __name__)
 
@@ -38,15 +40,18 @@ def get_moderation_queue():
             .order_by(ModerationQueue.priority.desc(), ModerationQueue.created_at.asc())\
             .paginate(page=page, per_page=per_page, error_out=False)
         
+        # Load and serialize all target posts of the page at once
+        post_ids = [item.target_id for item in queue_items.items if item.target_type == 'post']
+        posts = Post.query.filter(Post.id.in_(post_ids)).all() if post_ids else []
+        post_dicts = {post_dict['id']: post_dict for post_dict in Post.bulk_to_dict(posts)}
+        
         items = []
         for item in queue_items.items:
             item_dict = item.to_dict()
             
             # Add target content
-            if item.target_type == 'post':
-                post = Post.query.get(item.target_id)
-                if post:
-                    item_dict['content'] = post.to_dict()
+            if item.target_type == 'post' and item.target_id in post_dicts:
+                item_dict['content'] = post_dicts[item.target_id]
             
             items.append(item_dict)
         
@@ -124,6 +129,7 @@ def review_post(post_id):
             post.status = 'published'
             post.moderation_status = 'moderator_approved'
             post.published_at = datetime.utcnow()
+            fan_out_post(post)
         elif decision == 'reject':
             post.status = 'rejected'
             post.moderation_status = 'moderator_rejected'
@@ -142,6 +148,7 @@ def review_post(post_id):
             queue_item.completed_at = datetime.utcnow()
         
         db.session.commit()
+        invalidate_post(post_id)
         
         return jsonify({
             'message': f'Post {decision}d successfully',
@@ -211,8 +218,11 @@ def review_appeal(appeal_id):
             if post:
                 post.status = 'published'
                 post.published_at = datetime.utcnow()
+                fan_out_post(post)
         
         db.session.commit()
+        if decision == 'approve' and appeal.appeal_type == 'post_rejection':
+            invalidate_post(appeal.target_id)
         
         return jsonify({
             'message': f'Appeal {decision}d successfully',
@@ -1,13 +1,21 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import db
 from models.notification import Notification
+from models.notification_actor import NotificationActor
 from models.user import User
-from models.post import Post
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+from utils.sql import insert_ignore
 from datetime import datetime
 
 notification_bp = Blueprint('notification', __name__)
 
+# Message of an aggregated notification by type ({actor}: latest actor, {others}: number of other actors)
+AGGREGATE_MESSAGES = {
+    'like': '{actor} và {others} người khác đã thích bài viết của bạn'
+}
+
 @notification_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_notifications():
@@ -31,48 +39,21 @@ def get_notifications():
         elif category == 'post':
             query = query.filter(Notification.type.in_(post_types))
         
-        # Order by newest first
-        query = query.order_by(Notification.created_at.desc())
+        # Order by latest activity first (aggregated notifications move up on every new actor)
+        query = query.order_by(Notification.updated_at.desc(), Notification.id.desc())
         
         # Paginate
         notifications = query.paginate(page=page, per_page=per_page, error_out=False)
         
-        # Enrich notifications with actor info
-        notification_list = []
-        for notif in notifications.items:
-            notif_dict = notif.to_dict()
-            
-            # Get actor info (user who triggered the notification)
-            if notif.related_type in ['like', 'comment', 'share', 'friend_request']:
-                # related_id is the actor's user_id for these types
-                actor = User.query.get(notif.related_id)
-                if actor:
-                    notif_dict['actor'] = {
-                        'id': actor.id,
-                        'full_name': actor.full_name,
-                        'avatar_url': actor.avatar_url
-                    }
-            
-            # Get post info if applicable
-            if notif.related_type == 'post':
-                post = Post.query.get(notif.related_id)
-                if post:
-                    notif_dict['post'] = {
-                        'id': post.id,
-                        'caption': post.caption[:100] if post.caption else None
-                    }
-            
-            notification_list.append(notif_dict)
+        # Actors and posts of the whole page in one query each
+        notification_list = Notification.bulk_to_dict(notifications.items)
         
         return jsonify({
             'notifications': notification_list,
             'total': notifications.total,
             'pages': notifications.pages,
             'current_page': page,
-            'unread_count': Notification.query.filter_by(
-                user_id=current_user_id, 
-                is_read=False
-            ).count()
+            'unread_count': get_unread_count(current_user_id)
         }), 200
         
     except Exception as e:
@@ -82,6 +63,18 @@ def get_notifications():
         return jsonify({'error': str(e)}), 500
 
 
+@notification_bp.route('/unread-count', methods=['GET'])
+@jwt_required()
+def unread_count():
+    """Số thông báo chưa đọc (badge polling, doesn't touch the notifications table)"""
+    try:
+        current_user_id = int(get_jwt_identity())
+        return jsonify({'unread_count': get_unread_count(current_user_id)}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @notification_bp.route('/<int:notification_id>/read', methods=['POST'])
 @jwt_required()
 def mark_as_read(notification_id):
@@ -96,7 +89,13 @@ def mark_as_read(notification_id):
         if notification.user_id != current_user_id:
             return jsonify({'error': 'Unauthorized'}), 403
         
-        notification.is_read = True
+        # Only the request that flips is_read decrements the counter
+        changed = Notification.query.filter_by(
+            id=notification_id,
+            is_read=False
+        ).update({'is_read': True}, synchronize_session=False)
+        if changed:
+            _adjust_unread_count(current_user_id, -1)
         db.session.commit()
         
         return jsonify({'message': 'Marked as read'}), 200
@@ -117,6 +116,10 @@ def mark_all_as_read():
             user_id=current_user_id,
             is_read=False
         ).update({'is_read': True})
+        User.query.filter_by(id=current_user_id).update(
+            {User.unread_notification_count: 0},
+            synchronize_session=False
+        )
         
         db.session.commit()
         
@@ -127,21 +130,131 @@ def mark_all_as_read():
         return jsonify({'error': str(e)}), 500
 
 
-def create_notification(user_id, notification_type, title, message, related_id=None, related_type=None):
-    """Helper function to create a notification"""
-    try:
-        notification = Notification(
-            user_id=user_id,
-            type=notification_type,
-            title=title,
-            message=message,
-            related_id=related_id,
-            related_type=related_type
-        )
-        db.session.add(notification)
-        db.session.commit()
+def create_notification(user_id, notification_type, title, message, related_id=None, related_type=None,
+                        actor=None, target_id=None, target_type=None):
+    """
+    Helper function to create a notification
+    Types in AGGREGATE_MESSAGES are coalesced when actor and target are given:
+    every notification for the same (user, type, target) within one
+    NOTIFICATION_AGGREGATE_WINDOW_HOURS window updates a single row holding
+    the actor count and the latest actor ids, and marks it unread again.
+    """
+    for attempt in range(2):
+        try:
+            if actor is not None and target_id is not None and notification_type in AGGREGATE_MESSAGES:
+                notification = _aggregate_notification(
+                    user_id, notification_type, title, message, related_id, related_type,
+                    actor, target_id, target_type
+                )
+            else:
+                notification = Notification(
+                    user_id=user_id,
+                    type=notification_type,
+                    title=title,
+                    message=message,
+                    related_id=related_id,
+                    related_type=related_type,
+                    target_id=target_id,
+                    target_type=target_type,
+                    actor_ids=[actor.id] if actor is not None else None
+                )
+                db.session.add(notification)
+                _adjust_unread_count(user_id, 1)
+            db.session.commit()
+            return notification
+        except OperationalError as e:
+            # Concurrent first actors of a window can deadlock on the new row; the retry updates it
+            db.session.rollback()
+            error = e
+        except Exception as e:
+            db.session.rollback()
+            error = e
+            break
+    print(f"Error creating notification: {str(error)}")
+    return None
+
+
+def _aggregate_notification(user_id, notification_type, title, message, related_id, related_type,
+                            actor, target_id, target_type):
+    """Upsert the aggregate row of the current window. Caller commits."""
+    now = datetime.utcnow()
+    window = current_app.config.get('NOTIFICATION_AGGREGATE_WINDOW_HOURS', 24) * 3600
+    bucket = int((now - datetime(1970, 1, 1)).total_seconds() // window)
+    group_key = f'{notification_type}:{target_type}:{target_id}:{bucket}'
+    aggregate = Notification.query.filter_by(user_id=user_id, group_key=group_key)
+    
+    # Later actors lock the row of the window with a plain UPDATE (exclusive from the start)
+    inserted = False
+    if not aggregate.update({Notification.updated_at: now}, synchronize_session=False):
+        # First actor of the window creates the row; the unique (user_id, group_key) key makes this race-free
+        inserted = db.session.execute(
+            insert_ignore(Notification),
+            {
+                'user_id': user_id,
+                'type': notification_type,
+                'title': title,
+                'message': message,
+                'related_id': related_id,
+                'related_type': related_type,
+                'target_id': target_id,
+                'target_type': target_type,
+                'actor_count': 1,
+                'actor_ids': [actor.id],
+                'group_key': group_key,
+                'is_read': False,
+                'created_at': now,
+                'updated_at': now
+            }
+        ).rowcount
+        if not inserted:
+            # Created concurrently
+            aggregate.update({Notification.updated_at: now}, synchronize_session=False)
+    
+    # Already locked by this transaction
+    notification = aggregate.with_for_update().one()
+    
+    # Distinct actors of the window: the unique (notification_id, actor_id) key tells a new actor apart
+    new_actor = db.session.execute(
+        insert_ignore(NotificationActor),
+        {'notification_id': notification.id, 'actor_id': actor.id, 'created_at': now}
+    ).rowcount
+    if inserted:
+        _adjust_unread_count(user_id, 1)
         return notification
-    except Exception as e:
-        db.session.rollback()
-        print(f"Error creating notification: {str(e)}")
-        return None
+    
+    if new_actor:
+        notification.actor_count = (notification.actor_count or 1) + 1
+    actor_ids = notification.actor_ids or []
+    notification.actor_ids = ([actor.id] + [actor_id for actor_id in actor_ids if actor_id != actor.id])[
+        :current_app.config.get('NOTIFICATION_LATEST_ACTORS', 5)
+    ]
+    
+    others = notification.actor_count - 1
+    notification.title = title
+    notification.message = AGGREGATE_MESSAGES[notification_type].format(
+        actor=actor.full_name, others=others
+    ) if others else message
+    notification.related_id = related_id
+    notification.related_type = related_type
+    if notification.is_read:
+        # A read aggregate becomes unread again
+        _adjust_unread_count(user_id, 1)
+    notification.is_read = False
+    notification.updated_at = now
+    return notification
+
+
+def get_unread_count(user_id):
+    """Unread notifications of a user from the denormalized counter"""
+    return db.session.query(User.unread_notification_count).filter_by(id=user_id).scalar() or 0
+
+
+def _adjust_unread_count(user_id, delta):
+    """Atomically move users.unread_notification_count (never below 0). Caller commits."""
+    query = User.query.filter_by(id=user_id)
+    if delta < 0:
+        query = query.filter(User.unread_notification_count >= -delta)
+    query.update(
+        {User.unread_notification_count: func.coalesce(User.unread_notification_count, 0) + delta},
+        synchronize_session=False
+    )
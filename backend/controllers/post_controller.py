@@ -3,11 +3,17 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import db
 from models.post import Post
 from models.post_media import PostMedia
+from models.media_upload import MediaUpload
 from models.user import User
 from models.like import Like
-from utils.file_upload import upload_file, allowed_file
+from utils.file_upload import save_upload, allowed_file
+from utils.pagination import apply_keyset, keyset_page
 from datetime import datetime
 from controllers.notification_controller import create_notification
+from controllers.like_controller import get_likers_page
+from utils.timeline import fan_out_post, get_home_feed
+from utils.cache import feed_cache_key, post_cache_key, invalidate_post
+from extensions import cache, counter_buffer, media_pipeline
 
 post_bp = Blueprint('post', __name__)
 
@@ -41,16 +47,32 @@ def create_post():
         db.session.flush()  # Get post ID
         
         # Handle media
+        processing = []
         if 'media' in data and data['media']:
+            # Metadata captured at upload time (final values of uploads still processing are filled in by the pipeline)
+            uploads = {
+                upload.media_url: upload
+                for upload in MediaUpload.query.filter(
+                    MediaUpload.user_id == current_user_id,
+                    MediaUpload.media_url.in_([media_data['url'] for media_data in data['media']]),
+                    MediaUpload.status != 'failed'
+                )
+            }
+            
             for idx, media_data in enumerate(data['media']):
+                upload = uploads.get(media_data['url'])
                 media = PostMedia(
                     post_id=new_post.id,
                     media_type=media_data['type'],
                     media_url=media_data['url'],
-                    thumbnail_url=media_data.get('thumbnail_url'),
-                    display_order=idx
+                    display_order=idx,
+                    **(upload.media_fields() if upload else {})
                 )
+                if media_data.get('thumbnail_url'):
+                    media.thumbnail_url = media_data['thumbnail_url']
                 db.session.add(media)
+                if upload and upload.status == 'processing':
+                    processing.append((media, upload))
             
             # Update content type
             if len(data['media']) == 1:
@@ -60,11 +82,21 @@ def create_post():
         
         db.session.commit()
         
+        # A worker that finished before this commit could not see the new rows: copy its result here
+        for media, upload in processing:
+            db.session.refresh(upload)
+            if upload.status == 'ready':
+                for field, value in upload.media_fields().items():
+                    if value is not None:
+                        setattr(media, field, value)
+        
         # TODO: Trigger AI moderation (Phase 5)
         # For now, auto-publish for development
         new_post.status = 'published'
         new_post.published_at = datetime.utcnow()
+        fan_out_post(new_post)
         db.session.commit()
+        invalidate_post(new_post.id)
         
         return jsonify({
             'message': 'Post created successfully.',
@@ -100,17 +132,19 @@ def upload_media():
         if not allowed_file(file.filename, media_type):
             return jsonify({'error': f'Invalid file type for {media_type}'}), 400
         
-        # Upload file
+        # Save file, resize/re-encode in the background
         folder = 'posts/images' if media_type == 'image' else 'posts/videos'
-        file_url = upload_file(file, folder=folder)
+        upload = submit_media_upload(int(get_jwt_identity()), file, media_type, folder)
         
-        print(f"File uploaded successfully: {file_url}")
+        print(f"File uploaded successfully: {upload.media_url}")
         
         return jsonify({
             'message': 'File uploaded successfully',
-            'url': file_url,
-            'type': media_type
-        }), 200
+            'url': upload.media_url,
+            'type': media_type,
+            'media_id': upload.id,
+            'status': upload.status
+        }), 202 if upload.status == 'processing' else 200
         
     except Exception as e:
         print(f"Error in upload_media: {str(e)}")
@@ -119,60 +153,165 @@ def upload_media():
         return jsonify({'error': str(e)}), 500
 
 
+@post_bp.route('/upload-media/<int:media_id>', methods=['GET'])
+@jwt_required()
+def get_media_upload(media_id):
+    """Trạng thái xử lý của file đã upload"""
+    try:
+        upload = MediaUpload.query.get(media_id)
+        
+        if not upload or upload.user_id != int(get_jwt_identity()):
+            return jsonify({'error': 'Upload not found'}), 404
+        
+        return jsonify({'upload': upload.to_dict()}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def submit_media_upload(user_id, file, media_type, folder, variants=True):
+    """
+    Save an uploaded file, record it as a MediaUpload and queue its processing
+    variants: generate responsive copies (post media only)
+    Returns: the MediaUpload (status 'processing' until the worker finishes)
+    """
+    file_url, file_path, is_new, info = save_upload(file, folder=folder)
+    return record_media_upload(user_id, media_type, file_url, file_path, is_new, info, variants)
+
+
+def record_media_upload(user_id, media_type, file_url, file_path, is_new, info, variants=True):
+    """
+    Record a stored file as a MediaUpload and queue its processing (see submit_media_upload)
+    info: size/dimensions read while the file streamed in, known before processing finishes
+    """
+    upload = MediaUpload(
+        user_id=user_id,
+        media_type=media_type,
+        media_url=file_url,
+        width=info.get('width'),
+        height=info.get('height'),
+        file_size=info.get('file_size')
+    )
+    
+    # Same content uploaded before: reuse its processing result instead of redoing it
+    original = None
+    if not is_new:
+        original = MediaUpload.query.filter_by(media_url=file_url).order_by(MediaUpload.id).first()
+    if original:
+        _copy_processing_result(upload, original)
+    
+    db.session.add(upload)
+    db.session.commit()
+    
+    if not original:
+        media_pipeline.submit(upload.id, file_path, media_type, variants)
+        db.session.refresh(upload)
+    elif upload.status == 'processing':
+        # The original may have finished between our read and commit
+        db.session.refresh(original)
+        if original.status != 'processing':
+            _copy_processing_result(upload, original)
+            db.session.commit()
+    return upload
+
+
+def _copy_processing_result(upload, original):
+    for field in MediaUpload.PROCESSED_FIELDS:
+        setattr(upload, field, getattr(original, field))
+
+
 @post_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_posts():
     """
     Lấy danh sách bài viết (Newsfeed)
     Query params: page, per_page, status
-    Hiển thị: bài viết của bản thân và bạn bè
+    Cursor mode: cursor (empty for first page), include_total
+    feed=home: bài viết của bản thân và bạn bè (home timeline, cursor only)
     """
     try:
         current_user_id = int(get_jwt_identity())
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         status = request.args.get('status')
+        use_cursor = 'cursor' in request.args
+        cursor = request.args.get('cursor')
+        include_total = request.args.get('include_total', 'false').lower() == 'true'
+        feed = request.args.get('feed', 'public')
+        
+        if feed == 'home':
+            try:
+                items, next_cursor = get_home_feed(current_user_id, per_page, cursor)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            result = {
+                'posts': Post.bulk_to_dict(items),
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None
+            }
         
-        # Get list of friends (if friendship table exists)
-        # For now, show all public published posts
-        query = Post.query.filter(
-            Post.is_deleted == False,
-            Post.visibility == 'public'
-        )
-        
-        # Filter by status if provided
-        if status:
-            query = query.filter_by(status=status)
         else:
-            # Default: only show published posts
-            query = query.filter_by(status='published')
-        
-        # Order by newest first
-        query = query.order_by(Post.created_at.desc())
-        
-        posts = query.paginate(page=page, per_page=per_page, error_out=False)
-        
-        # Get list of post IDs that current user has liked
-        liked_post_ids = set(
-            like.target_id for like in Like.query.filter_by(
-                user_id=current_user_id,
-                target_type='post'
-            ).all()
+            # Public feed is the same for every user - serve it from cache
+            mode = f'cursor:{cursor or ""}:{include_total}' if use_cursor else f'page:{page}'
+            cache_key = feed_cache_key(status or 'published', per_page, mode)
+            result = cache.get(cache_key)
+            
+            if result is None:
+                # Public feed: all public published posts
+                query = Post.query.filter(
+                    Post.is_deleted == False,
+                    Post.visibility == 'public'
+                )
+                
+                # Filter by status if provided
+                if status:
+                    query = query.filter_by(status=status)
+                else:
+                    # Default: only show published posts
+                    query = query.filter_by(status='published')
+                
+                if use_cursor:
+                    # Keyset pagination on (created_at, id) - served by idx_status (status, created_at)
+                    try:
+                        page_query = apply_keyset(query, Post.created_at, Post.id, cursor)
+                    except ValueError as e:
+                        return jsonify({'error': str(e)}), 400
+                    
+                    items, next_cursor = keyset_page(page_query, per_page)
+                    result = {
+                        'next_cursor': next_cursor,
+                        'has_more': next_cursor is not None
+                    }
+                    if include_total:
+                        result['total'] = query.order_by(None).count()
+                else:
+                    # Order by newest first
+                    query = query.order_by(Post.created_at.desc())
+                    
+                    posts = query.paginate(page=page, per_page=per_page, error_out=False)
+                    items = posts.items
+                    result = {
+                        'total': posts.total,
+                        'pages': posts.pages,
+                        'current_page': page
+                    }
+                
+                result['posts'] = Post.bulk_to_dict(items)
+                cache.set(cache_key, result)
+        
+        # Get which posts of this page the current user has liked
+        liked_post_ids = Like.liked_target_ids(
+            current_user_id,
+            'post',
+            [post_dict['id'] for post_dict in result['posts']]
         )
         
         # Add is_liked field to each post
-        posts_data = []
-        for post in posts.items:
-            post_dict = post.to_dict()
-            post_dict['is_liked'] = post.id in liked_post_ids
-            posts_data.append(post_dict)
+        for post_dict in result['posts']:
+            post_dict['is_liked'] = post_dict['id'] in liked_post_ids
         
-        return jsonify({
-            'posts': posts_data,
-            'total': posts.total,
-            'pages': posts.pages,
-            'current_page': page
-        }), 200
+        return jsonify(result), 200
         
     except Exception as e:
         print(f"Error in get_posts: {str(e)}")
@@ -203,7 +342,7 @@ def get_my_posts():
         posts = query.paginate(page=page, per_page=per_page, error_out=False)
         
         return jsonify({
-            'posts': [post.to_dict() for post in posts.items],
+            'posts': Post.bulk_to_dict(posts.items),
             'total': posts.total,
             'pages': posts.pages,
             'current_page': page
@@ -218,12 +357,18 @@ def get_my_posts():
 def get_post(post_id):
     """Xem chi tiết bài viết"""
     try:
-        post = Post.query.get(post_id)
+        post_dict = cache.get(post_cache_key(post_id))
         
-        if not post or post.is_deleted:
-            return jsonify({'error': 'Post not found'}), 404
+        if post_dict is None:
+            post = Post.query.get(post_id)
+            
+            if not post or post.is_deleted:
+                return jsonify({'error': 'Post not found'}), 404
+            
+            post_dict = post.to_dict()
+            cache.set(post_cache_key(post_id), post_dict)
         
-        return jsonify({'post': post.to_dict()}), 200
+        return jsonify({'post': post_dict}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -261,6 +406,7 @@ def update_post(post_id):
         post.updated_at = datetime.utcnow()
         
         db.session.commit()
+        invalidate_post(post_id)
         
         # TODO: Trigger AI moderation again (Phase 5)
         
@@ -291,6 +437,7 @@ def delete_post(post_id):
         # Soft delete
         post.mark_for_deletion(retention_days=30)
         db.session.commit()
+        invalidate_post(post_id)
         
         return jsonify({'message': 'Post deleted successfully'}), 200
         
@@ -312,55 +459,58 @@ def toggle_like(post_id):
         if not post or post.is_deleted:
             return jsonify({'error': 'Post not found'}), 404
         
-        # Check if user already liked this post
-        existing_like = Like.query.filter_by(
-            user_id=current_user_id,
-            target_type='post',
-            target_id=post_id
-        ).first()
-        
-        if existing_like:
-            # Unlike: Remove the like
-            print(f"[LIKE] Removing like from post {post_id}")
-            db.session.delete(existing_like)
-            post.like_count = max(0, post.like_count - 1)  # Ensure not negative
-            is_liked = False
-        else:
-            # Like: Add a new like
-            print(f"[LIKE] Adding like to post {post_id}")
-            new_like = Like(
-                user_id=current_user_id,
-                target_type='post',
-                target_id=post_id
-            )
-            db.session.add(new_like)
-            post.like_count = post.like_count + 1
-            is_liked = True
-            
-            # Create notification for post author (if not liking own post)
-            if post.user_id != current_user_id:
-                liker = User.query.get(current_user_id)
-                if liker:
-                    create_notification(
-                        user_id=post.user_id,
-                        notification_type='like',
-                        title='Lượt thích mới',
-                        message=f'{liker.full_name} đã thích bài viết của bạn',
-                        related_id=current_user_id,  # Who liked
-                        related_type='like'
-                    )
+        # Atomic toggle: like_count is adjusted in SQL from the affected row count
+        is_liked, changed = Like.toggle(current_user_id, 'post', post_id)
+        print(f"[LIKE] {'Added' if is_liked else 'Removed'} like on post {post_id}")
         
+        # Commit first so the row lock on the post is released as soon as possible
         db.session.commit()
+        invalidate_post(post_id)
+        
+        # Create notification for post author (if not liking own post)
+        if is_liked and changed and post.user_id != current_user_id:
+            liker = User.query.get(current_user_id)
+            if liker:
+                create_notification(
+                    user_id=post.user_id,
+                    notification_type='like',
+                    title='Lượt thích mới',
+                    message=f'{liker.full_name} đã thích bài viết của bạn',
+                    related_id=current_user_id,  # Who liked
+                    related_type='like',
+                    actor=liker,
+                    target_id=post_id,
+                    target_type='post'
+                )
         
-        print(f"[LIKE] Success! Post {post_id} now has {post.like_count} likes. User liked: {is_liked}")
+        like_count = counter_buffer.current('post', post_id, 'like_count', post.like_count)
+        print(f"[LIKE] Success! Post {post_id} now has {like_count} likes. User liked: {is_liked}")
         
         return jsonify({
             'message': 'Like toggled successfully',
             'is_liked': is_liked,
-            'like_count': post.like_count
+            'like_count': like_count
         }), 200
         
     except Exception as e:
         db.session.rollback()
         print(f"[LIKE] Error: {str(e)}")
         return jsonify({'error': str(e)}), 500
+
+
+@post_bp.route('/<int:post_id>/likes', methods=['GET'])
+@jwt_required()
+def get_post_likes(post_id):
+    """
+    Danh sách người đã thích bài viết
+    Query params: cursor, per_page
+    """
+    try:
+        post = Post.query.get(post_id)
+        if not post or post.is_deleted:
+            return jsonify({'error': 'Post not found'}), 404
+        
+        return get_likers_page('post', post_id)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,293 @@
+import os
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from werkzeug.utils import secure_filename
+from models import db
+from models.upload_session import UploadSession
+from models.user import User
+from utils.file_upload import allowed_file, store_file, UploadDigest, STREAM_BUFFER_SIZE
+from controllers.post_controller import record_media_upload
+
+try:
+    import fcntl
+except ImportError:  # Windows development servers: requests for one upload are not serialized
+    fcntl = None
+
+upload_bp = Blueprint('upload', __name__)
+
+# Maximum file size per target and media type
+MAX_UPLOAD_SIZES = {
+    'post': {'image': 20 * 1024 * 1024, 'video': 2 * 1024 * 1024 * 1024},  # 20MB / 2GB
+    'comment': {'image': 5 * 1024 * 1024, 'video': 50 * 1024 * 1024}  # 5MB / 50MB
+}
+
+
+def _part_path(session_id):
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], 'tmp', f'{session_id}.part')
+
+
+def _received_size(session_id):
+    """Bytes already on disk: the resume offset (includes partial chunks of dropped requests)"""
+    try:
+        return os.path.getsize(_part_path(session_id))
+    except OSError:
+        return 0
+
+
+@contextmanager
+def _locked_part(session_id):
+    """
+    Open the part file of an upload with an exclusive, non-blocking file lock.
+    Writes and completion of one upload are serialized on the file rather than
+    a database row lock, so no connection or row lock is held while a slow
+    client streams its chunk.
+    Yields: the open file, or None if another request holds the lock or the
+    upload was completed/expired meanwhile (part file gone)
+    """
+    try:
+        part = open(_part_path(session_id), 'r+b')
+    except FileNotFoundError:
+        yield None
+        return
+    
+    try:
+        if fcntl is not None:
+            try:
+                fcntl.flock(part, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield None
+                return
+        
+        # Completed while we were waiting to open it
+        if os.fstat(part.fileno()).st_nlink == 0:
+            yield None
+            return
+        
+        yield part
+    finally:
+        part.close()
+
+
+def _busy(session_id):
+    return jsonify({'error': 'Upload is busy or no longer active', 'offset': _received_size(session_id)}), 409
+
+
+def _get_session(upload_id):
+    """
+    Load an active upload session of the current user
+    Returns: (session, error response)
+    """
+    session = UploadSession.query.filter_by(id=upload_id).first()
+    
+    if not session or session.user_id != int(get_jwt_identity()):
+        return None, (jsonify({'error': 'Upload not found'}), 404)
+    
+    if session.status == 'completed':
+        return None, (jsonify({'error': 'Upload already completed', 'media_id': session.media_upload_id}), 409)
+    
+    ttl = timedelta(hours=current_app.config.get('UPLOAD_SESSION_TTL_HOURS', 24))
+    if session.updated_at and session.updated_at < datetime.utcnow() - ttl:
+        if os.path.exists(_part_path(session.id)):
+            os.remove(_part_path(session.id))
+        db.session.delete(session)
+        db.session.commit()
+        return None, (jsonify({'error': 'Upload expired'}), 410)
+    
+    return session, None
+
+
+@upload_bp.route('/', methods=['POST'])
+@jwt_required()
+def init_upload():
+    """
+    Bắt đầu upload theo từng phần (resumable)
+    Body: {filename, size, type: 'image'|'video', target: 'post'|'comment'}
+    """
+    try:
+        current_user_id = int(get_jwt_identity())
+        user = User.query.get(current_user_id)
+        
+        if not user or not user.is_active():
+            return jsonify({'error': 'Account is restricted'}), 403
+        
+        data = request.get_json() or {}
+        filename = secure_filename(data.get('filename') or '')
+        media_type = data.get('type', 'image')
+        target = data.get('target', 'post')
+        
+        if target not in MAX_UPLOAD_SIZES:
+            return jsonify({'error': 'Invalid target'}), 400
+        
+        if media_type not in ('image', 'video'):
+            return jsonify({'error': 'Invalid media type'}), 400
+        
+        if not allowed_file(filename, media_type):
+            return jsonify({'error': f'Invalid file type for {media_type}'}), 400
+        
+        try:
+            total_size = int(data.get('size'))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'size is required'}), 400
+        
+        max_size = MAX_UPLOAD_SIZES[target][media_type]
+        if total_size <= 0 or total_size > max_size:
+            return jsonify({'error': f'File too large. Maximum size: {max_size // (1024*1024)}MB'}), 413
+        
+        session = UploadSession(
+            id=uuid.uuid4().hex,
+            user_id=current_user_id,
+            target=target,
+            media_type=media_type,
+            filename=filename,
+            total_size=total_size
+        )
+        
+        os.makedirs(os.path.dirname(_part_path(session.id)), exist_ok=True)
+        open(_part_path(session.id), 'wb').close()
+        
+        db.session.add(session)
+        db.session.commit()
+        
+        return jsonify({
+            'upload': session.to_dict(offset=0),
+            'chunk_size': current_app.config.get('RESUMABLE_CHUNK_SIZE', 5 * 1024 * 1024)
+        }), 201
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@upload_bp.route('/<upload_id>', methods=['GET'])
+@jwt_required()
+def get_upload(upload_id):
+    """Trạng thái upload: offset để tiếp tục sau khi mất kết nối"""
+    try:
+        session, error = _get_session(upload_id)
+        if error:
+            return error
+        
+        return jsonify({'upload': session.to_dict(offset=_received_size(session.id))}), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@upload_bp.route('/<upload_id>', methods=['PUT'])
+@jwt_required()
+def upload_chunk(upload_id):
+    """
+    Gửi một phần của file
+    Query: offset (must equal the bytes already received)
+    Body: raw bytes (application/octet-stream)
+    """
+    try:
+        session, error = _get_session(upload_id)
+        if error:
+            return error
+        
+        data = session.to_dict()
+        total_size = session.total_size
+        # Release the connection before streaming the body
+        db.session.commit()
+        
+        with _locked_part(upload_id) as part:
+            if part is None:
+                return _busy(upload_id)
+            
+            received = os.fstat(part.fileno()).st_size
+            offset = request.args.get('offset', type=int)
+            
+            if offset != received:
+                return jsonify({'error': 'Offset mismatch', 'offset': received}), 409
+            
+            remaining = total_size - received
+            if request.content_length is not None and request.content_length > remaining:
+                return jsonify({'error': 'Chunk exceeds declared file size', 'offset': received}), 413
+            
+            # Stream the body to disk; bytes of a dropped request stay and are resumed from
+            written = 0
+            part.seek(received)
+            for chunk in iter(lambda: request.stream.read(STREAM_BUFFER_SIZE), b''):
+                written += len(chunk)
+                if written > remaining:
+                    part.truncate(received)
+                    return jsonify({'error': 'Chunk exceeds declared file size', 'offset': received}), 413
+                part.write(chunk)
+        
+        # Short transaction: only the activity timestamp
+        UploadSession.query.filter_by(id=upload_id).update(
+            {'updated_at': datetime.utcnow()},
+            synchronize_session=False
+        )
+        db.session.commit()
+        
+        data['offset'] = received + written
+        return jsonify({'upload': data}), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@upload_bp.route('/<upload_id>/complete', methods=['POST'])
+@jwt_required()
+def complete_upload(upload_id):
+    """Hoàn tất upload: lưu file và đưa vào hàng đợi xử lý"""
+    try:
+        session, error = _get_session(upload_id)
+        if error:
+            return error
+        
+        total_size = session.total_size
+        ext = session.filename.rsplit('.', 1)[1].lower()
+        db.session.commit()
+        
+        with _locked_part(upload_id) as part:
+            if part is None:
+                return _busy(upload_id)
+            
+            received = os.fstat(part.fileno()).st_size
+            if received != total_size:
+                return jsonify({'error': 'Upload incomplete', 'offset': received}), 409
+            
+            # Hash the file before opening a transaction
+            digest = UploadDigest(ext)
+            for chunk in iter(lambda: part.read(STREAM_BUFFER_SIZE), b''):
+                digest.update(chunk)
+            
+            if fcntl is None:
+                part.close()  # Nothing is locked, and Windows cannot remove an open file
+            
+            # The file lock keeps a second complete out; status is committed before it is released
+            session = UploadSession.query.get(upload_id)
+            folder = f'{session.target}s/{session.media_type}s'
+            file_url, file_path, is_new, info = store_file(_part_path(session.id), ext, folder, digest)
+            
+            session.status = 'completed'
+            upload = record_media_upload(
+                session.user_id,
+                session.media_type,
+                file_url,
+                file_path,
+                is_new,
+                info,
+                variants=session.target == 'post'
+            )
+            session.media_upload_id = upload.id
+            db.session.commit()
+        
+        return jsonify({
+            'message': 'File uploaded successfully',
+            'url': upload.media_url,
+            'type': upload.media_type,
+            'media_id': upload.id,
+            'status': upload.status
+        }), 202 if upload.status == 'processing' else 200
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
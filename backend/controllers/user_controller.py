@@ -3,7 +3,8 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import db
 from models.user import User
 from models.user_activity_log import UserActivityLog
-from utils.file_upload import upload_file, allowed_file
+from utils.file_upload import allowed_file, delete_file
+from controllers.post_controller import submit_media_upload
 from datetime import datetime
 
 user_bp = Blueprint('user', __name__)
@@ -107,15 +108,21 @@ def upload_avatar():
             print(f"File type not allowed: {file.filename}")
             return jsonify({'error': 'Invalid file type. Only images allowed'}), 400
         
-        # Upload file
+        # Upload file (optimized by the media pipeline, off the request thread)
         print("Uploading file...")
-        file_url = upload_file(file, folder='avatars')
+        upload = submit_media_upload(current_user_id, file, 'image', folder='avatars', variants=False)
+        file_url = upload.media_url
         print(f"File uploaded: {file_url}")
         
         # TODO: AI moderation for avatar (Phase 5)
         # For now, directly update
+        old_avatar_url = user.avatar_url
         user.avatar_url = file_url
         user.updated_at = datetime.utcnow()
+        
+        # Delete the previous avatar (shared content-addressed files are left to the upload sweeper)
+        if old_avatar_url and old_avatar_url.startswith('/uploads/'):
+            delete_file(old_avatar_url)
         db.session.commit()
         print("Database updated")
         
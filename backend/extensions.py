@@ -2,7 +2,15 @@
 from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
 from flask_mail import Mail
+from utils.cache import Cache
+from utils.counters import CounterBuffer
+from utils.media_pipeline import MediaPipeline
+from utils.storage import Storage
 
 bcrypt = Bcrypt()
 jwt = JWTManager()
 mail = Mail()
+cache = Cache()
+counter_buffer = CounterBuffer()
+media_pipeline = MediaPipeline()
+storage = Storage()
@@ -8,6 +8,9 @@ from models.user_activity_log import UserActivityLog
 from models.user_role import UserRole
 from models.post import Post
 from models.post_media import PostMedia
+from models.media_upload import MediaUpload
+from models.media_blob import MediaBlob
+from models.upload_session import UploadSession
 from models.comment import Comment
 from models.like import Like
 from models.share import Share
@@ -19,3 +22,5 @@ from models.moderation_queue import ModerationQueue
 from models.violation_history import ViolationHistory
 from models.banned_keyword import BannedKeyword
 from models.notification import Notification
+from models.notification_actor import NotificationActor
+from models.home_timeline import HomeTimeline
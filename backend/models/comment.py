@@ -16,6 +16,10 @@ class Comment(db.Model):
     user_id = db.Column(db.BigInteger, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     parent_comment_id = db.Column(db.BigInteger, db.ForeignKey('comments.id', ondelete='CASCADE'))
     
+    # Materialized path: zero-padded ids of all ancestors and self, e.g. '0000000012/0000000034/'
+    path = db.Column(db.String(255))
+    depth = db.Column(db.Integer, default=0)  # 0 for root comments
+    
     content = db.Column(db.Text, nullable=False)
     
     # Media attachment
@@ -37,13 +41,42 @@ class Comment(db.Model):
     post = db.relationship('Post', back_populates='comments')
     author = db.relationship('User', back_populates='comments')
     
-    def to_dict(self, include_replies=False):
-        """Convert model to dictionary"""
+    __table_args__ = (
+        db.Index('idx_parent_created', 'parent_comment_id', 'created_at', 'id'),
+        db.Index('idx_comment_path', 'post_id', 'path'),
+        db.Index('idx_comment_media_url', 'media_url', mysql_length=255),
+    )
+    
+    PATH_SEGMENT_WIDTH = 10
+    MAX_DEPTH = 14  # Keeps ON DELETE CASCADE on parent_comment_id within MySQL's 15-level limit
+    
+    def set_path(self, parent=None):
+        """Build path/depth from the parent's path (self.id must already be assigned)"""
+        segment = f'{self.id:0{self.PATH_SEGMENT_WIDTH}d}/'
+        self.path = (parent.path if parent else '') + segment
+        self.depth = (parent.depth + 1) if parent else 0
+    
+    def subtree_query(self, max_depth=None):
+        """Self and all descendants as one range scan on idx_comment_path"""
+        query = Comment.query.filter(
+            Comment.post_id == self.post_id,
+            Comment.path.startswith(self.path)
+        )
+        if max_depth is not None:
+            query = query.filter(Comment.depth <= self.depth + max_depth)
+        return query
+    
+    def to_dict(self, include_replies=False, author=None):
+        """
+        Convert model to dictionary
+        author: pre-loaded author dict (see bulk_to_dict), loaded lazily when omitted
+        """
         data = {
             'id': self.id,
             'post_id': self.post_id,
             'user_id': self.user_id,
             'parent_comment_id': self.parent_comment_id,
+            'depth': self.depth,
             'content': self.content,
             'media_url': self.media_url,
             'media_type': self.media_type,
@@ -54,18 +87,45 @@ class Comment(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
         
-        if self.author:
-            data['author'] = {
+        if author is None and self.author:
+            author = {
                 'id': self.author.id,
                 'username': self.author.username,
                 'full_name': self.author.full_name,
                 'avatar_url': self.author.avatar_url
             }
+        if author:
+            data['author'] = author
         
         if include_replies:
             data['replies'] = [reply.to_dict() for reply in self.replies.all()]
         
-        return data
+        # Include counter increments not yet flushed to the database
+        from extensions import counter_buffer
+        return counter_buffer.merge('comment', data)
+    
+    @staticmethod
+    def bulk_to_dict(comments):
+        """Serialize comments with all author columns loaded in one query"""
+        from models.user import User
+        
+        comments = list(comments)
+        if not comments:
+            return []
+        
+        rows = db.session.query(User.id, User.username, User.full_name, User.avatar_url)\
+            .filter(User.id.in_({comment.user_id for comment in comments})).all()
+        authors = {
+            row.id: {
+                'id': row.id,
+                'username': row.username,
+                'full_name': row.full_name,
+                'avatar_url': row.avatar_url
+            }
+            for row in rows
+        }
+        
+        return [comment.to_dict(author=authors.get(comment.user_id, {})) for comment in comments]
     
     def __repr__(self):
         return f'<Comment {self.id} on Post {self.post_id}>'
@@ -0,0 +1,31 @@
+from models import db
+
+class HomeTimeline(db.Model):
+    """Materialized home feed entry (fan-out-on-write)"""
+    __tablename__ = 'home_timelines'
+    
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    user_id = db.Column(db.BigInteger, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    post_id = db.Column(db.BigInteger, db.ForeignKey('posts.id', ondelete='CASCADE'), nullable=False)
+    author_id = db.Column(db.BigInteger, nullable=False)
+    
+    # Copy of posts.created_at so the feed is a single range read on this table
+    created_at = db.Column(db.DateTime, nullable=False)
+    
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'post_id', name='unique_timeline_entry'),
+        db.Index('idx_home_timeline', 'user_id', 'created_at', 'post_id'),
+        db.Index('idx_timeline_author', 'user_id', 'author_id')
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'post_id': self.post_id,
+            'author_id': self.author_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+    
+    def __repr__(self):
+        return f'<HomeTimeline Post {self.post_id} for User {self.user_id}>'
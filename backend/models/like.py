@@ -1,6 +1,6 @@
 from datetime import datetime
 from models import db
-from sqlalchemy import Enum
+from sqlalchemy import Enum, and_, delete, or_
 
 class Like(db.Model):
     __tablename__ = 'likes'
@@ -14,10 +14,88 @@ class Like(db.Model):
     
     __table_args__ = (
         db.UniqueConstraint('user_id', 'target_type', 'target_id', name='unique_like'),
-        db.Index('idx_target', 'target_type', 'target_id'),
+        # Covers "who liked this" pages: seek on (target, created_at, id), user_id read from the index
+        db.Index('idx_target_likers', 'target_type', 'target_id', 'created_at', 'id', 'user_id'),
         db.Index('idx_user_likes', 'user_id', 'created_at')
     )
     
+    @staticmethod
+    def liked_target_ids(user_id, target_type, target_ids):
+        """
+        Subset of target_ids the user has liked.
+        Bounded by the page size: one lookup on the unique_like (user_id, target_type, target_id) index.
+        """
+        target_ids = list(target_ids)
+        if not target_ids:
+            return set()
+        
+        rows = db.session.query(Like.target_id).filter(
+            Like.user_id == user_id,
+            Like.target_type == target_type,
+            Like.target_id.in_(target_ids)
+        ).all()
+        return {row.target_id for row in rows}
+    
+    @staticmethod
+    def liked_targets(user_id, targets):
+        """
+        Subset of (target_type, target_id) pairs the user has liked, across target types.
+        One query: user_id = ? AND ((target_type = 'post' AND target_id IN (...)) OR ...)
+        """
+        ids_by_type = {}
+        for target_type, target_id in targets:
+            ids_by_type.setdefault(target_type, set()).add(target_id)
+        if not ids_by_type:
+            return set()
+        
+        rows = db.session.query(Like.target_type, Like.target_id).filter(
+            Like.user_id == user_id,
+            or_(*[
+                and_(Like.target_type == target_type, Like.target_id.in_(target_ids))
+                for target_type, target_ids in ids_by_type.items()
+            ])
+        ).all()
+        return {(row.target_type, row.target_id) for row in rows}
+    
+    @staticmethod
+    def toggle(user_id, target_type, target_id):
+        """
+        Toggle a like with one atomic statement per direction.
+        DELETE the like row, or INSERT IGNORE it on unique_like; the target's
+        like_count only moves if a row was actually affected, so concurrent
+        toggles never lose updates. Counter changes go through the
+        write-behind counter buffer. Caller commits.
+        Returns: (is_liked, changed)
+        """
+        from extensions import counter_buffer
+        from utils.sql import insert_ignore
+        
+        deleted = db.session.execute(
+            delete(Like).where(
+                Like.user_id == user_id,
+                Like.target_type == target_type,
+                Like.target_id == target_id
+            )
+        ).rowcount
+        
+        if deleted:
+            counter_buffer.add(target_type, target_id, 'like_count', -1)
+            return False, True
+        
+        inserted = db.session.execute(
+            insert_ignore(Like),
+            {
+                'user_id': user_id,
+                'target_type': target_type,
+                'target_id': target_id,
+                'created_at': datetime.utcnow()
+            }
+        ).rowcount
+        
+        if inserted:
+            counter_buffer.add(target_type, target_id, 'like_count', 1)
+        return True, bool(inserted)
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -0,0 +1,58 @@
+from datetime import datetime
+from sqlalchemy import select, update
+from models import db
+
+class MediaBlob(db.Model):
+    """
+    Content-addressed stored file: one row (and one file on disk) per distinct
+    upload content, shared by every upload of the same bytes.
+    Blobs are not reference-counted: cleanup_orphaned_uploads deletes a blob
+    once no post, comment or avatar refers to it and it has not been uploaded
+    again within the grace period (last_acquired_at).
+    """
+    __tablename__ = 'media_blobs'
+    
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    content_hash = db.Column(db.String(64), unique=True, nullable=False)  # BLAKE2b-256 of the uploaded bytes
+    media_url = db.Column(db.String(500), unique=True, nullable=False)
+    file_size = db.Column(db.BigInteger)  # Size as uploaded
+    last_acquired_at = db.Column(db.DateTime, default=datetime.utcnow)  # Latest upload of this content
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    @staticmethod
+    def acquire(content_hash, media_url, file_size):
+        """
+        Record an upload of content_hash, registering media_url as its location
+        if this content has not been stored before
+        Returns: (media_url of the blob, is_new)
+        """
+        from utils.sql import insert_ignore
+        
+        now = datetime.utcnow()
+        inserted = db.session.execute(
+            insert_ignore(MediaBlob),
+            {
+                'content_hash': content_hash,
+                'media_url': media_url,
+                'file_size': file_size,
+                'last_acquired_at': now,
+                'created_at': now
+            }
+        ).rowcount
+        
+        if inserted:
+            return media_url, True
+        
+        # Restarts the sweeper's grace period for this content
+        db.session.execute(
+            update(MediaBlob)
+            .where(MediaBlob.content_hash == content_hash)
+            .values(last_acquired_at=now)
+        )
+        existing_url = db.session.execute(
+            select(MediaBlob.media_url).where(MediaBlob.content_hash == content_hash)
+        ).scalar_one()
+        return existing_url, False
+    
+    def __repr__(self):
+        return f'<MediaBlob {self.content_hash[:12]}>'
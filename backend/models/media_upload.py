@@ -0,0 +1,71 @@
+from datetime import datetime
+from models import db
+from sqlalchemy import Enum
+
+class MediaUpload(db.Model):
+    """Uploaded file waiting to be (or already) processed, before it is attached to a post/comment"""
+    __tablename__ = 'media_uploads'
+    
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    user_id = db.Column(db.BigInteger, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    media_type = db.Column(Enum('image', 'video', name='media_upload_type_enum'), nullable=False)
+    media_url = db.Column(db.String(500), nullable=False, index=True)
+    
+    status = db.Column(Enum('processing', 'ready', 'failed', name='media_upload_status_enum'), default='processing')
+    error = db.Column(db.Text)
+    
+    # Media info (filled in by the processing worker)
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
+    duration = db.Column(db.Integer)  # For videos (seconds)
+    file_size = db.Column(db.BigInteger)
+    variants = db.Column(db.JSON)  # Images: [{width, height, webp, jpeg}], videos: [{width, height, bandwidth, hls}], smallest first
+    poster_url = db.Column(db.String(500))  # Video poster frame
+    stream_url = db.Column(db.String(500))  # Video HLS master playlist
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime)
+    
+    # Columns written by the processing worker (copied to duplicate uploads of the same content)
+    PROCESSED_FIELDS = ('status', 'error', 'width', 'height', 'duration', 'file_size',
+                        'variants', 'poster_url', 'stream_url', 'processed_at')
+    
+    @property
+    def thumbnail_url(self):
+        """Video poster, or the smallest JPEG variant of an image (widest client support)"""
+        if self.media_type == 'video':
+            return self.poster_url
+        return self.variants[0]['jpeg'] if self.variants else None
+    
+    def media_fields(self):
+        """Processed metadata as PostMedia column values"""
+        return {
+            'width': self.width,
+            'height': self.height,
+            'duration': self.duration,
+            'file_size': self.file_size,
+            'variants': self.variants,
+            'thumbnail_url': self.thumbnail_url,
+            'stream_url': self.stream_url
+        }
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'media_type': self.media_type,
+            'url': self.media_url,
+            'status': self.status,
+            'error': self.error,
+            'width': self.width,
+            'height': self.height,
+            'duration': self.duration,
+            'file_size': self.file_size,
+            'variants': self.variants,
+            'poster_url': self.poster_url,
+            'stream_url': self.stream_url,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'processed_at': self.processed_at.isoformat() if self.processed_at else None
+        }
+    
+    def __repr__(self):
+        return f'<MediaUpload {self.id} ({self.status})>'
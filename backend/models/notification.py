@@ -21,9 +21,22 @@ class Notification(db.Model):
     related_id = db.Column(db.BigInteger)  # post_id, user_id, etc.
     related_type = db.Column(db.String(50))
     
+    # Aggregation: notifications of the same type about the same target share one row
+    target_id = db.Column(db.BigInteger)  # e.g. the liked post
+    target_type = db.Column(db.String(50))
+    actor_count = db.Column(db.Integer, default=1)
+    actor_ids = db.Column(db.JSON)  # Latest actors first (NOTIFICATION_LATEST_ACTORS)
+    group_key = db.Column(db.String(100))  # '<type>:<target_type>:<target_id>:<window>', NULL if not aggregated
+    
     is_read = db.Column(db.Boolean, default=False, index=True)
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)  # Latest activity, inbox order
+    
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'group_key', name='uq_notification_group'),
+        db.Index('idx_user_notifications_updated', 'user_id', 'updated_at'),
+    )
     
     def to_dict(self):
         # Determine category based on type
@@ -31,6 +44,7 @@ class Notification(db.Model):
         post_types = ['like', 'comment', 'reply', 'share', 'friend_request', 'friend_accept']
         
         category = 'account' if self.type in account_types else 'post'
+        updated_at = self.updated_at or self.created_at
         
         return {
             'id': self.id,
@@ -41,6 +55,82 @@ class Notification(db.Model):
             'message': self.message,
             'related_id': self.related_id,
             'related_type': self.related_type,
+            'target_id': self.target_id,
+            'target_type': self.target_type,
+            'actor_count': self.actor_count or 1,
+            'actor_ids': self.actor_ids or [],
             'is_read': self.is_read,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': updated_at.isoformat() if updated_at else None
         }
+    
+    # related_type values whose related_id is the user who triggered the notification
+    ACTOR_RELATED_TYPES = ('like', 'comment', 'share', 'friend_request')
+    
+    @staticmethod
+    def bulk_to_dict(notifications):
+        """
+        Serialize notifications with their actors and posts loaded in one
+        query per type (instead of one lookup per notification)
+        """
+        from models.user import User
+        from models.post import Post
+        
+        notifications = list(notifications)
+        if not notifications:
+            return []
+        
+        user_ids, post_ids = set(), set()
+        for notification in notifications:
+            if notification.related_type in Notification.ACTOR_RELATED_TYPES and notification.related_id:
+                user_ids.add(notification.related_id)
+            if notification.related_type == 'post' and notification.related_id:
+                post_ids.add(notification.related_id)
+            if notification.target_type == 'post' and notification.target_id:
+                post_ids.add(notification.target_id)
+            user_ids.update(notification.actor_ids or [])
+        
+        actors = {}
+        if user_ids:
+            rows = db.session.query(User.id, User.full_name, User.avatar_url)\
+                .filter(User.id.in_(user_ids)).all()
+            actors = {
+                row.id: {
+                    'id': row.id,
+                    'full_name': row.full_name,
+                    'avatar_url': row.avatar_url
+                }
+                for row in rows
+            }
+        
+        posts = {}
+        if post_ids:
+            rows = db.session.query(Post.id, Post.caption).filter(Post.id.in_(post_ids)).all()
+            posts = {
+                row.id: {
+                    'id': row.id,
+                    'caption': row.caption[:100] if row.caption else None
+                }
+                for row in rows
+            }
+        
+        results = []
+        for notification in notifications:
+            data = notification.to_dict()
+            
+            # Actor info (user who triggered the notification)
+            if notification.related_type in Notification.ACTOR_RELATED_TYPES and notification.related_id in actors:
+                data['actor'] = actors[notification.related_id]
+            if notification.actor_ids:
+                data['actors'] = [actors[actor_id] for actor_id in notification.actor_ids if actor_id in actors]
+            
+            # Post info if applicable
+            post_id = notification.related_id if notification.related_type == 'post' else None
+            if notification.target_type == 'post':
+                post_id = notification.target_id
+            if post_id in posts:
+                data['post'] = posts[post_id]
+            
+            results.append(data)
+        
+        return results
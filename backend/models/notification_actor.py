@@ -0,0 +1,18 @@
+from datetime import datetime
+from models import db
+
+class NotificationActor(db.Model):
+    """Distinct actor of an aggregated notification (drives notifications.actor_count)"""
+    __tablename__ = 'notification_actors'
+    
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    notification_id = db.Column(db.BigInteger, db.ForeignKey('notifications.id', ondelete='CASCADE'), nullable=False)
+    actor_id = db.Column(db.BigInteger, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('notification_id', 'actor_id', name='unique_notification_actor'),
+    )
+    
+    def __repr__(self):
+        return f'<NotificationActor {self.actor_id} on Notification {self.notification_id}>'
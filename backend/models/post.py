@@ -57,8 +57,15 @@ class Post(db.Model):
     media = db.relationship('PostMedia', back_populates='post', lazy='dynamic', cascade='all, delete-orphan')
     comments = db.relationship('Comment', back_populates='post', lazy='dynamic', cascade='all, delete-orphan')
     
-    def to_dict(self, include_author=True):
-        """Convert model to dictionary"""
+    __table_args__ = (
+        db.Index('idx_status', 'status', 'created_at'),
+    )
+    
+    def to_dict(self, include_author=True, media=None, author=None):
+        """
+        Convert model to dictionary
+        media/author: pre-loaded values (see bulk_to_dict), loaded lazily when omitted
+        """
         data = {
             'id': self.id,
             'user_id': self.user_id,
@@ -73,18 +80,67 @@ class Post(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'published_at': self.published_at.isoformat() if self.published_at else None,
-            'media': [m.to_dict() for m in self.media.all()]
+            'media': media if media is not None else [m.to_dict() for m in self.media.all()]
         }
         
-        if include_author and self.author:
-            data['author'] = {
-                'id': self.author.id,
-                'username': self.author.username,
-                'full_name': self.author.full_name,
-                'avatar_url': self.author.avatar_url
+        if include_author:
+            if author is None and self.author:
+                author = {
+                    'id': self.author.id,
+                    'username': self.author.username,
+                    'full_name': self.author.full_name,
+                    'avatar_url': self.author.avatar_url
+                }
+            if author:
+                data['author'] = author
+        
+        # Include counter increments not yet flushed to the database
+        from extensions import counter_buffer
+        return counter_buffer.merge('post', data)
+    
+    @staticmethod
+    def bulk_to_dict(posts, include_author=True):
+        """
+        Serialize a page of posts without N+1 lazy loads:
+        one query for all media and one for the author columns
+        """
+        from models.post_media import PostMedia
+        from models.user import User
+        
+        posts = list(posts)
+        if not posts:
+            return []
+        
+        post_ids = [post.id for post in posts]
+        media_by_post = {post_id: [] for post_id in post_ids}
+        media_rows = PostMedia.query.filter(PostMedia.post_id.in_(post_ids))\
+            .order_by(PostMedia.post_id, PostMedia.display_order, PostMedia.id).all()
+        for media in media_rows:
+            media_by_post[media.post_id].append(media.to_dict())
+        
+        authors = {}
+        if include_author:
+            author_ids = {post.user_id for post in posts}
+            rows = db.session.query(User.id, User.username, User.full_name, User.avatar_url)\
+                .filter(User.id.in_(author_ids)).all()
+            authors = {
+                row.id: {
+                    'id': row.id,
+                    'username': row.username,
+                    'full_name': row.full_name,
+                    'avatar_url': row.avatar_url
+                }
+                for row in rows
             }
         
-        return data
+        results = []
+        for post in posts:
+            data = post.to_dict(include_author=False, media=media_by_post[post.id])
+            if post.user_id in authors:
+                data['author'] = authors[post.user_id]
+            results.append(data)
+        
+        return results
     
     def mark_for_deletion(self, retention_days=30):
         """Mark post for soft deletion"""
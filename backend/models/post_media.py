@@ -3,6 +3,9 @@ from models import db
 
 class PostMedia(db.Model):
     __tablename__ = 'post_media'
+    __table_args__ = (
+        db.Index('idx_media_url', 'media_url', mysql_length=255),
+    )
     
     id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
     post_id = db.Column(db.BigInteger, db.ForeignKey('posts.id', ondelete='CASCADE'), nullable=False, index=True)
@@ -15,6 +18,8 @@ class PostMedia(db.Model):
     height = db.Column(db.Integer)
     duration = db.Column(db.Integer)  # For videos (seconds)
     file_size = db.Column(db.BigInteger)
+    variants = db.Column(db.JSON)  # Images: [{width, height, webp, jpeg}], videos: [{width, height, bandwidth, hls}]
+    stream_url = db.Column(db.Text)  # Video HLS master playlist
     
     # AI analysis
     ai_nsfw_score = db.Column(db.Numeric(5, 2))
@@ -28,6 +33,15 @@ class PostMedia(db.Model):
     # Relationships
     post = db.relationship('Post', back_populates='media')
     
+    def srcset(self, fmt='webp'):
+        """srcset attribute value for the variants (the original is the largest candidate)"""
+        if self.media_type != 'image' or not self.variants:
+            return None
+        candidates = [f"{variant[fmt]} {variant['width']}w" for variant in self.variants]
+        if self.width:
+            candidates.append(f"{self.media_url} {self.width}w")
+        return ', '.join(candidates)
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -38,6 +52,10 @@ class PostMedia(db.Model):
             'height': self.height,
             'duration': self.duration,
             'file_size': self.file_size,
+            'variants': self.variants,
+            'stream_url': self.stream_url,
+            'srcset': self.srcset('webp'),
+            'fallback_srcset': self.srcset('jpeg'),
             'display_order': self.display_order
         }
     
@@ -0,0 +1,36 @@
+from datetime import datetime
+from models import db
+from sqlalchemy import Enum
+
+class UploadSession(db.Model):
+    """Resumable chunked upload in progress (bytes are appended to a .part file on disk)"""
+    __tablename__ = 'upload_sessions'
+    
+    id = db.Column(db.String(32), primary_key=True)  # Random token, used in the upload URL
+    user_id = db.Column(db.BigInteger, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    target = db.Column(Enum('post', 'comment', name='upload_session_target_enum'), nullable=False)
+    media_type = db.Column(Enum('image', 'video', name='upload_session_media_type_enum'), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    total_size = db.Column(db.BigInteger, nullable=False)
+    
+    status = db.Column(Enum('uploading', 'completed', name='upload_session_status_enum'), default='uploading')
+    media_upload_id = db.Column(db.BigInteger, db.ForeignKey('media_uploads.id', ondelete='SET NULL'))
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self, offset=None):
+        return {
+            'upload_id': self.id,
+            'target': self.target,
+            'media_type': self.media_type,
+            'filename': self.filename,
+            'total_size': self.total_size,
+            'offset': offset,
+            'status': self.status,
+            'media_id': self.media_upload_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+    
+    def __repr__(self):
+        return f'<UploadSession {self.id} ({self.status})>'
@@ -31,6 +31,12 @@ class User(db.Model):
     otp_created_at = db.Column(db.DateTime)
     otp_verified = db.Column(db.Boolean, default=False)
     
+    # Denormalized number of accepted friends (decides fan-out-on-write vs on-read)
+    friend_count = db.Column(db.Integer, default=0)
+    
+    # Denormalized number of unread notifications (badge polling)
+    unread_notification_count = db.Column(db.Integer, default=0)
+    
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -41,6 +47,10 @@ class User(db.Model):
     comments = db.relationship('Comment', foreign_keys='Comment.user_id', back_populates='author', lazy='dynamic', cascade='all, delete-orphan')
     roles = db.relationship('UserRole', foreign_keys='UserRole.user_id', back_populates='user', lazy='dynamic', cascade='all, delete-orphan')
     
+    __table_args__ = (
+        db.Index('idx_avatar_url', 'avatar_url', mysql_length=255),
+    )
+    
     def to_dict(self, include_sensitive=False):
         """Convert model to dictionary"""
         data = {
@@ -0,0 +1,217 @@
+"""
+Script to rebuild denormalized counters from their source tables
+posts.like_count / comment_count / share_count, comments.like_count,
+users.friend_count / unread_notification_count
+
+Walks each table in primary-key ranges, aggregates the source rows of the
+range with GROUP BY and patches only rows whose stored value differs.
+Every chunk is its own short transaction and updates are compare-and-set
+on the old values, so it is safe to run against a live database.
+
+Increments still pending in a running server's write-behind counter buffer
+(COUNTER_WRITE_BEHIND) are already counted in the source tables but not yet
+in the stored counters, and are added on top once flushed. So a mismatch is
+only patched after it has been seen twice, --settle seconds apart (longer
+than COUNTER_FLUSH_INTERVAL_MS plus commit time): a row whose stored value
+and source count were both unchanged across that window has nothing pending
+for the changes already counted. Rows with activity in between are left
+for the next run.
+
+Usage: python reconcile_counters.py [--chunk-size 5000] [--dry-run] [--pause 0.05] [--settle 2]
+"""
+import argparse
+import time
+from sqlalchemy import and_, bindparam, func, update
+from app import create_app
+from models import db
+from models.post import Post
+from models.comment import Comment
+from models.like import Like
+from models.share import Share
+from models.friendship import Friendship
+from models.notification import Notification
+from models.user import User
+
+
+def _like_counts(target_type):
+    def aggregate(lo, hi):
+        return db.session.query(Like.target_id, func.count()).filter(
+            Like.target_type == target_type,
+            Like.target_id >= lo,
+            Like.target_id < hi
+        ).group_by(Like.target_id)
+    return aggregate
+
+
+def _comment_counts(lo, hi):
+    return db.session.query(Comment.post_id, func.count()).filter(
+        Comment.post_id >= lo,
+        Comment.post_id < hi
+    ).group_by(Comment.post_id)
+
+
+def _share_counts(lo, hi):
+    return db.session.query(Share.post_id, func.count()).filter(
+        Share.post_id >= lo,
+        Share.post_id < hi
+    ).group_by(Share.post_id)
+
+
+def _friend_counts(lo, hi):
+    return db.session.query(Friendship.user_id, func.count()).filter(
+        Friendship.status == 'accepted',
+        Friendship.user_id >= lo,
+        Friendship.user_id < hi
+    ).group_by(Friendship.user_id)
+
+
+def _unread_notification_counts(lo, hi):
+    return db.session.query(Notification.user_id, func.count()).filter(
+        Notification.is_read == False,
+        Notification.user_id >= lo,
+        Notification.user_id < hi
+    ).group_by(Notification.user_id)
+
+
+# model -> {counter column: aggregate(lo, hi) returning (id, count) rows}
+COUNTERS = [
+    (Post, {
+        'like_count': _like_counts('post'),
+        'comment_count': _comment_counts,
+        'share_count': _share_counts
+    }),
+    (Comment, {
+        'like_count': _like_counts('comment')
+    }),
+    (User, {
+        'friend_count': _friend_counts,
+        'unread_notification_count': _unread_notification_counts
+    })
+]
+
+
+def _patch_statement(table, columns):
+    """
+    Compare-and-set UPDATE: only applies if the row still holds the values we read
+    (NULL counters are compared as -1)
+    """
+    conditions = [table.c.id == bindparam('row_id')]
+    conditions.extend(
+        func.coalesce(table.c[column], -1) == bindparam(f'old_{column}') for column in columns
+    )
+    return update(table).where(and_(*conditions)).values({
+        column: bindparam(f'new_{column}') for column in columns
+    })
+
+
+def _mismatches(table, columns, counters, lo, hi, ids=None):
+    """
+    Rows of one primary-key range whose stored counters differ from the source tables
+    Returns: (rows scanned, {row_id: (old values, new values)})
+    """
+    query = db.session.query(table.c.id, *[table.c[column] for column in columns]).filter(
+        table.c.id >= lo,
+        table.c.id < hi
+    )
+    if ids is not None:
+        query = query.filter(table.c.id.in_(ids))
+    stored = query.all()
+    actual = {column: dict(aggregate(lo, hi).all()) for column, aggregate in counters.items()}
+    
+    mismatches = {}
+    for row in stored:
+        old = {column: getattr(row, column) for column in columns}
+        new = {column: actual[column].get(row.id, 0) for column in columns}
+        if old != new:
+            mismatches[row.id] = (old, new)
+    return len(stored), mismatches
+
+
+def reconcile_table(model, counters, chunk_size=5000, dry_run=False, pause=0.0, settle=2.0):
+    """Reconcile the counters of one table. Returns (rows scanned, rows patched, rows skipped)"""
+    table = model.__table__
+    columns = list(counters)
+    statement = _patch_statement(table, columns)
+    max_id = db.session.query(func.max(table.c.id)).scalar() or 0
+    scanned, patched, skipped = 0, 0, 0
+    
+    # First pass: find candidate rows
+    candidates = []
+    for lo in range(1, max_id + 1, chunk_size):
+        hi = lo + chunk_size
+        count, mismatches = _mismatches(table, columns, counters, lo, hi)
+        db.session.commit()
+        scanned += count
+        if mismatches:
+            candidates.append((lo, hi, mismatches))
+        
+        if pause:
+            time.sleep(pause)
+    
+    if not candidates:
+        return scanned, patched, skipped
+    
+    # Let deltas of changes already counted above reach the database
+    time.sleep(settle)
+    
+    # Second pass: patch the rows that stayed the same on both sides
+    for lo, hi, first in candidates:
+        _, second = _mismatches(table, columns, counters, lo, hi, ids=list(first))
+        
+        params = []
+        for row_id, (old, new) in first.items():
+            if second.get(row_id) != (old, new):
+                skipped += 1
+                continue
+            param = {'row_id': row_id}
+            param.update({f'old_{column}': -1 if value is None else value for column, value in old.items()})
+            param.update({f'new_{column}': value for column, value in new.items()})
+            params.append(param)
+        
+        if params and not dry_run:
+            db.session.execute(statement, params)
+        
+        db.session.commit()
+        patched += len(params)
+        
+        if pause:
+            time.sleep(pause)
+    
+    return scanned, patched, skipped
+
+
+def reconcile_counters(chunk_size=5000, dry_run=False, pause=0.0, settle=None):
+    """Reconcile every denormalized counter"""
+    app = create_app()
+    with app.app_context():
+        try:
+            if settle is None:
+                # Flush interval plus slack for the flush and request commits
+                settle = app.config.get('COUNTER_FLUSH_INTERVAL_MS', 500) / 1000.0 + 1.5
+            
+            for model, counters in COUNTERS:
+                started = time.monotonic()
+                scanned, patched, skipped = reconcile_table(model, counters, chunk_size, dry_run, pause, settle)
+                action = 'would patch' if dry_run else 'patched'
+                print(f"✓ {model.__tablename__}: scanned {scanned} rows, {action} {patched} "
+                      f"({', '.join(counters)}), skipped {skipped} changing rows "
+                      f"in {time.monotonic() - started:.1f}s")
+            
+            print("\n✅ Counter reconciliation finished!")
+        
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Error reconciling counters: {str(e)}")
+            raise
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rebuild denormalized counters')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='Primary-key range per batch')
+    parser.add_argument('--dry-run', action='store_true', help='Report differences without writing')
+    parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between batches')
+    parser.add_argument('--settle', type=float, default=None,
+                        help='Seconds between finding and re-checking a mismatch (default: flush interval + 1.5)')
+    args = parser.parse_args()
+    
+    reconcile_counters(args.chunk_size, args.dry_run, args.pause, args.settle)
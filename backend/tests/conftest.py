@@ -0,0 +1,67 @@
+"""
+Shared fixtures
+
+Tests run against TEST_DATABASE_URL (e.g. the MySQL social_media_test_db),
+or a SQLite file in a temporary folder when it is not set. The schema is
+created fresh for every test and dropped afterwards.
+"""
+import os
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import BigInteger
+from sqlalchemy.ext.compiler import compiles
+from app import create_app
+from extensions import counter_buffer, media_pipeline, storage
+from models import db
+from models.user import User
+
+
+@compiles(BigInteger, 'sqlite')
+def _sqlite_big_integer(type_, compiler, **kw):
+    # SQLite only auto-increments INTEGER PRIMARY KEY columns
+    return 'INTEGER'
+
+
+@pytest.fixture
+def app(tmp_path):
+    """App with an empty database (used by pytest-flask for the client fixture)"""
+    app = create_app('testing', {
+        'SQLALCHEMY_DATABASE_URI': os.getenv('TEST_DATABASE_URL') or f'sqlite:///{tmp_path / "test.db"}',
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+        'CACHE_BACKEND': 'none',
+        'MEDIA_ASYNC_PROCESSING': False
+    })
+    
+    with app.app_context():
+        yield app
+        
+        counter_buffer.flush()
+        media_pipeline.shutdown()
+        storage.shutdown()
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def make_user(app):
+    """Create users: make_user('alice') -> User"""
+    def make(username, **fields):
+        user = User(
+            email=f'{username}@example.com',
+            username=username,
+            full_name=username.title(),
+            password_hash='x',
+            **fields
+        )
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return make
+
+
+@pytest.fixture
+def auth_headers(app):
+    """Authorization headers of a user: auth_headers(user) -> dict"""
+    def headers(user):
+        return {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+    return headers
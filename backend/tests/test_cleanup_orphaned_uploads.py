@@ -0,0 +1,60 @@
+import os
+import time
+from datetime import datetime, timedelta
+from cleanup_orphaned_uploads import sweep_uploads
+from models import db
+from models.media_blob import MediaBlob
+from models.media_upload import MediaUpload
+
+OLD = time.time() - 2 * 24 * 3600
+
+
+def add_old_blob(app, content_hash, last_acquired_at=None):
+    """A stored blob whose file was written two days ago. Returns (url, path)"""
+    relative = f'posts/images/{content_hash[:2]}/{content_hash}.jpg'
+    path = os.path.join(app.config['UPLOAD_FOLDER'], relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'jpeg')
+    os.utime(path, (OLD, OLD))
+    url = f'/uploads/{relative}'
+    db.session.add(MediaBlob(
+        content_hash=content_hash,
+        media_url=url,
+        file_size=4,
+        last_acquired_at=last_acquired_at or datetime.utcfromtimestamp(OLD)
+    ))
+    db.session.commit()
+    return url, path
+
+
+def test_sweep_keeps_old_blob_uploaded_again(app, make_user):
+    user = make_user('author')
+    orphan_url, orphan_path = add_old_blob(app, 'a' * 64)
+    reuploaded_url, reuploaded_path = add_old_blob(app, 'b' * 64)
+    # Deduplicated upload of the old content: the draft is not posted yet
+    db.session.add(MediaUpload(user_id=user.id, media_type='image', media_url=reuploaded_url))
+    db.session.commit()
+    
+    stats = sweep_uploads(app.config['UPLOAD_FOLDER'], timedelta(hours=24))
+    
+    assert stats['deleted'] == 1
+    assert not os.path.exists(orphan_path)
+    assert os.path.exists(reuploaded_path)
+    assert MediaBlob.query.filter_by(media_url=reuploaded_url).count() == 1
+
+
+def test_sweep_keeps_old_blob_acquired_again(app):
+    orphan_url, orphan_path = add_old_blob(app, 'a' * 64)
+    acquired_url, acquired_path = add_old_blob(app, 'b' * 64)
+    
+    # Deduplicated upload of the old content
+    url, is_new = MediaBlob.acquire('b' * 64, '/uploads/posts/images/bb/other.jpg', 4)
+    db.session.commit()
+    assert (url, is_new) == (acquired_url, False)
+    
+    stats = sweep_uploads(app.config['UPLOAD_FOLDER'], timedelta(hours=24))
+    
+    assert stats['deleted'] == 1
+    assert not os.path.exists(orphan_path)
+    assert os.path.exists(acquired_path)
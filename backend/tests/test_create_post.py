@@ -0,0 +1,36 @@
+from sqlalchemy import event, update
+from models import db
+from models.media_upload import MediaUpload
+from models.post_media import PostMedia
+
+
+def test_media_processed_during_create_post_keeps_metadata(client, make_user, auth_headers):
+    user = make_user('author')
+    upload = MediaUpload(user_id=user.id, media_type='image', media_url='/uploads/posts/images/a.jpg')
+    db.session.add(upload)
+    db.session.commit()
+    upload_id = upload.id
+    
+    finished = []
+    
+    def worker_finishes(session):
+        # The pipeline commits its result before the new post_media row is visible to it
+        if finished:
+            return
+        finished.append(upload_id)
+        session.execute(
+            update(MediaUpload).where(MediaUpload.id == upload_id).values(status='ready', width=800, height=600)
+        )
+    
+    event.listen(db.session, 'before_commit', worker_finishes)
+    try:
+        response = client.post('/api/posts/', headers=auth_headers(user), json={
+            'caption': 'x',
+            'media': [{'type': 'image', 'url': '/uploads/posts/images/a.jpg'}]
+        })
+    finally:
+        event.remove(db.session, 'before_commit', worker_finishes)
+    
+    assert response.status_code == 201, response.json
+    media = PostMedia.query.filter_by(post_id=response.json['post']['id']).one()
+    assert (media.width, media.height) == (800, 600)
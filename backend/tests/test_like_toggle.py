@@ -0,0 +1,32 @@
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from extensions import counter_buffer
+from models import db
+from models.like import Like
+from models.post import Post
+
+TOGGLES = 1000
+LIKERS = 40
+
+
+@pytest.mark.parametrize('write_behind', [True, False])
+def test_parallel_toggles_keep_like_count_exact(app, make_user, auth_headers, monkeypatch, write_behind):
+    monkeypatch.setattr(counter_buffer, 'enabled', write_behind)
+    author = make_user('author')
+    post = Post(user_id=author.id, caption='viral', status='published')
+    db.session.add(post)
+    db.session.commit()
+    post_id = post.id
+    headers = [auth_headers(make_user(f'liker{i}')) for i in range(LIKERS)]
+    
+    def toggle(i):
+        return app.test_client().post(f'/api/posts/{post_id}/like', headers=headers[i % LIKERS]).status_code
+    
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        statuses = list(executor.map(toggle, range(TOGGLES)))
+    
+    assert statuses == [200] * TOGGLES
+    counter_buffer.flush()
+    db.session.expire_all()
+    likes = Like.query.filter_by(target_type='post', target_id=post_id).count()
+    assert db.session.get(Post, post_id).like_count == likes
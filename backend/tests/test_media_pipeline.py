@@ -0,0 +1,43 @@
+from concurrent.futures import Future
+from extensions import media_pipeline
+from models import db
+from models.media_upload import MediaUpload
+
+
+class PendingExecutor:
+    """Executor whose jobs never finish, recording what was submitted"""
+    
+    def __init__(self):
+        self.jobs = []
+    
+    def submit(self, worker, *args, **kwargs):
+        self.jobs.append(worker.__name__)
+        return Future()
+
+
+def test_transcodes_are_bounded_and_do_not_share_the_image_pool(app, make_user, tmp_path, monkeypatch):
+    executors = {'image': PendingExecutor(), 'video': PendingExecutor()}
+    monkeypatch.setattr(media_pipeline, 'enabled', True)
+    monkeypatch.setattr(media_pipeline, 'ffmpeg', 'ffmpeg')
+    monkeypatch.setattr(media_pipeline, 'ffprobe', 'ffprobe')
+    monkeypatch.setattr(media_pipeline, '_get_executor', lambda kind: executors[kind])
+    user = make_user('author')
+    video = tmp_path / 'video.mp4'
+    video.write_bytes(b'mp4')
+    
+    uploads = []
+    for media_type in ['video'] * (app.config['MEDIA_MAX_PENDING_TRANSCODES'] + 1) + ['image']:
+        upload = MediaUpload(user_id=user.id, media_type=media_type, media_url=f'/uploads/{len(uploads)}')
+        db.session.add(upload)
+        db.session.commit()
+        media_pipeline.submit(upload.id, str(video), media_type)
+        uploads.append(upload)
+    
+    assert executors['video'].jobs == ['transcode_video'] * app.config['MEDIA_MAX_PENDING_TRANSCODES']
+    assert executors['image'].jobs == ['optimize_image']
+    
+    # The video over the limit is kept as uploaded instead of queueing
+    db.session.refresh(uploads[-2])
+    assert uploads[-2].status == 'ready'
+    assert uploads[-2].stream_url is None
+    assert [upload.status for upload in uploads[:-2]] == ['processing'] * app.config['MEDIA_MAX_PENDING_TRANSCODES']
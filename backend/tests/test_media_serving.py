@@ -0,0 +1,49 @@
+import os
+import pytest
+from werkzeug.exceptions import NotFound
+from models import db
+from models.media_blob import MediaBlob
+from models.media_upload import MediaUpload
+from utils.media_serving import send_upload
+
+CONTENT_HASH = 'c' * 64
+
+
+def write_upload(app, relative, data=b'data'):
+    path = os.path.join(app.config['UPLOAD_FOLDER'], relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def serve(app, filename):
+    with app.test_request_context(f'/uploads/{filename}'):
+        return send_upload(app.config['UPLOAD_FOLDER'], filename)
+
+
+def test_blob_is_immutable_only_once_processed(app, make_user):
+    relative = f'posts/images/cc/{CONTENT_HASH}.jpg'
+    url = f'/uploads/{relative}'
+    write_upload(app, relative)
+    upload = MediaUpload(user_id=make_user('author').id, media_type='image', media_url=url)
+    db.session.add_all([upload, MediaBlob(content_hash=CONTENT_HASH, media_url=url)])
+    db.session.commit()
+    
+    response = serve(app, relative)
+    assert response.cache_control.no_cache
+    assert not response.cache_control.immutable
+    
+    upload.status = 'ready'
+    db.session.commit()
+    response = serve(app, relative)
+    assert response.cache_control.immutable
+    assert response.cache_control.max_age == 365 * 24 * 3600
+
+
+def test_resumable_chunks_are_not_served(app, client):
+    write_upload(app, 'tmp/abc.part', b'chunk')
+    
+    with pytest.raises(NotFound):
+        serve(app, 'posts/../tmp/abc.part')
+    # Not found pages fall back to the frontend
+    assert client.get('/uploads/tmp/abc.part').data != b'chunk'
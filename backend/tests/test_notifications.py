@@ -0,0 +1,22 @@
+from models import db
+from models.post import Post
+
+
+def test_like_notification_counts_distinct_likers(client, make_user, auth_headers):
+    author = make_user('author')
+    post = Post(user_id=author.id, caption='x', status='published')
+    db.session.add(post)
+    db.session.commit()
+    likers = [make_user(f'liker{i}') for i in range(6)]
+    
+    for liker in likers:
+        client.post(f'/api/posts/{post.id}/like', headers=auth_headers(liker))
+    # The oldest liker (no longer among the latest 5 actor ids) unlikes and likes again
+    for _ in range(2):
+        client.post(f'/api/posts/{post.id}/like', headers=auth_headers(likers[0]))
+        client.post(f'/api/posts/{post.id}/like', headers=auth_headers(likers[0]))
+    
+    notifications = client.get('/api/notifications/', headers=auth_headers(author)).json['notifications']
+    assert len(notifications) == 1
+    assert notifications[0]['actor_count'] == 6
+    assert notifications[0]['message'] == 'Liker0 và 5 người khác đã thích bài viết của bạn'
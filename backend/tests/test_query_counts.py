@@ -0,0 +1,114 @@
+"""
+List endpoints must issue the same number of queries for 1 item as for a
+full page (no per-item lookups while serializing)
+"""
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event
+from models import db
+from models.like import Like
+from models.moderation_queue import ModerationQueue
+from models.notification import Notification
+from models.post import Post
+from models.post_media import PostMedia
+from models.user_role import UserRole
+
+
+@contextmanager
+def count_queries():
+    """Collect the SQL statements executed inside the block"""
+    statements = []
+    
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def add_posts(author, viewer, count, **fields):
+    """Posts with one image each, liked by viewer"""
+    posts = []
+    for _ in range(count):
+        post = Post(user_id=author.id, caption='caption', status='published', **fields)
+        db.session.add(post)
+        db.session.flush()
+        db.session.add(PostMedia(post_id=post.id, media_type='image', media_url=f'/uploads/posts/{post.id}.jpg'))
+        db.session.add(Like(user_id=viewer.id, target_type='post', target_id=post.id))
+        posts.append(post)
+    db.session.commit()
+    return posts
+
+
+def assert_constant_queries(client, url, headers, add_items):
+    """Query count of url with 1 item equals the count with a page of 20"""
+    add_items(1)
+    with count_queries() as one:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    
+    add_items(19)
+    with count_queries() as page:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    
+    assert len(page) == len(one), '\n'.join(page)
+
+
+@pytest.mark.parametrize('url', ['/api/posts/?per_page=20', '/api/posts/?per_page=20&cursor='])
+def test_public_feed_query_count(client, make_user, auth_headers, url):
+    viewer = make_user('viewer')
+    
+    def add_items(count):
+        for _ in range(count):
+            author = make_user(f'author{Post.query.count()}')
+            add_posts(author, viewer, 1)
+    
+    assert_constant_queries(client, url, auth_headers(viewer), add_items)
+
+
+def test_my_posts_query_count(client, make_user, auth_headers):
+    viewer = make_user('viewer')
+    assert_constant_queries(
+        client, '/api/posts/my-posts?per_page=20', auth_headers(viewer),
+        lambda count: add_posts(viewer, viewer, count)
+    )
+
+
+def test_moderation_queue_query_count(client, make_user, auth_headers):
+    moderator = make_user('moderator')
+    db.session.add(UserRole(user_id=moderator.id, role='moderator'))
+    db.session.commit()
+    
+    def add_items(count):
+        author = make_user(f'author{Post.query.count()}')
+        for post in add_posts(author, moderator, count, moderation_status='ai_flagged'):
+            db.session.add(ModerationQueue(target_type='post', target_id=post.id, source='ai_flagged'))
+        db.session.commit()
+    
+    assert_constant_queries(client, '/api/moderation/queue?per_page=20', auth_headers(moderator), add_items)
+
+
+def test_notifications_query_count(client, make_user, auth_headers):
+    viewer = make_user('viewer')
+    
+    def add_items(count):
+        for post in add_posts(viewer, viewer, count):
+            actor = make_user(f'actor{post.id}')
+            db.session.add(Notification(
+                user_id=viewer.id,
+                type='like',
+                title='Lượt thích mới',
+                message=f'{actor.full_name} đã thích bài viết của bạn',
+                related_id=actor.id,
+                related_type='like',
+                target_id=post.id,
+                target_type='post',
+                actor_ids=[actor.id, viewer.id]
+            ))
+        db.session.commit()
+    
+    assert_constant_queries(client, '/api/notifications/?per_page=20', auth_headers(viewer), add_items)
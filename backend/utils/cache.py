@@ -0,0 +1,180 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryBackend:
+    """In-process LRU cache with per-entry TTL"""
+    
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+    
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+    
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+    
+    def get_counter(self, key):
+        with self._lock:
+            return self._counters.get(key, 0)
+    
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+
+class RedisBackend:
+    """Shared cache in Redis (all workers see the same entries and versions)"""
+    
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url)
+    
+    def get(self, key):
+        value = self.client.get(key)
+        return value.decode('utf-8') if value is not None else None
+    
+    def set(self, key, value, ttl):
+        self.client.set(key, value, ex=ttl)
+    
+    def delete(self, key):
+        self.client.delete(key)
+    
+    def get_counter(self, key):
+        value = self.client.get(key)
+        return int(value) if value is not None else 0
+    
+    def incr(self, key):
+        return self.client.incr(key)
+
+
+class Cache:
+    """
+    Read-through cache for feed pages and post details.
+    Values are stored as JSON so callers can freely mutate what they get back.
+    Backend errors are treated as misses so the API keeps serving from MySQL.
+    """
+    
+    def __init__(self):
+        self.backend = None
+        self.default_ttl = 30
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+    
+    def init_app(self, app):
+        backend = app.config.get('CACHE_BACKEND', 'memory')
+        self.default_ttl = app.config.get('CACHE_DEFAULT_TTL', 30)
+        
+        if backend == 'redis':
+            self.backend = RedisBackend(app.config['REDIS_URL'])
+        elif backend == 'memory':
+            self.backend = MemoryBackend(app.config.get('CACHE_MAX_ENTRIES', 1024))
+        else:
+            self.backend = None
+        
+        app.extensions['cache'] = self
+    
+    def _record(self, hit):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+    
+    def get(self, key):
+        """Return cached value or None"""
+        if self.backend is None:
+            return None
+        try:
+            raw = self.backend.get(key)
+        except Exception as e:
+            print(f"Cache get failed: {e}")
+            raw = None
+        self._record(raw is not None)
+        return json.loads(raw) if raw is not None else None
+    
+    def set(self, key, value, ttl=None):
+        if self.backend is None:
+            return
+        try:
+            self.backend.set(key, json.dumps(value), ttl or self.default_ttl)
+        except Exception as e:
+            print(f"Cache set failed: {e}")
+    
+    def delete(self, key):
+        if self.backend is None:
+            return
+        try:
+            self.backend.delete(key)
+        except Exception as e:
+            print(f"Cache delete failed: {e}")
+    
+    def version(self, namespace):
+        """Current generation of a namespace (part of its keys)"""
+        if self.backend is None:
+            return 0
+        try:
+            return self.backend.get_counter(f'version:{namespace}')
+        except Exception as e:
+            print(f"Cache version lookup failed: {e}")
+            return 0
+    
+    def bump(self, namespace):
+        """Invalidate every key of a namespace by moving to a new generation"""
+        if self.backend is None:
+            return
+        try:
+            self.backend.incr(f'version:{namespace}')
+        except Exception as e:
+            print(f"Cache invalidation failed: {e}")
+    
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__ if self.backend else None,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 4) if total else 0.0
+        }
+
+
+def feed_cache_key(*parts):
+    """Key for a public feed page, scoped to the current feed generation"""
+    from extensions import cache
+    return 'feed:{}:{}'.format(cache.version('feed'), ':'.join(str(part) for part in parts))
+
+
+def post_cache_key(post_id):
+    return f'post:{post_id}'
+
+
+def invalidate_post(post_id=None):
+    """Write-through invalidation after a post (or anything shown in feeds) changes"""
+    from extensions import cache
+    if post_id is not None:
+        cache.delete(post_cache_key(post_id))
+    cache.bump('feed')
@@ -0,0 +1,170 @@
+import atexit
+import threading
+from collections import defaultdict
+from sqlalchemy import bindparam, case, event, update
+from models import db
+from models.post import Post
+from models.comment import Comment
+
+# target_type -> (model, counter columns that may be buffered)
+COUNTER_TARGETS = {
+    'post': (Post, ('like_count', 'comment_count', 'share_count')),
+    'comment': (Comment, ('like_count',))
+}
+
+
+def _counter_update(target_type, columns):
+    """UPDATE target SET col = MAX(col + :d_col, 0), ... WHERE id = :target_id"""
+    table = COUNTER_TARGETS[target_type][0].__table__
+    values = {}
+    for column in columns:
+        current = table.c[column]
+        delta = bindparam(f'd_{column}')
+        values[column] = case((current + delta < 0, 0), else_=current + delta)
+    return update(table).where(table.c.id == bindparam('target_id')).values(values)
+
+
+def apply_counter_deltas(session, deltas):
+    """
+    Apply {(target_type, target_id): {column: delta}} with one executemany
+    UPDATE per target type and column set
+    """
+    groups = defaultdict(list)
+    for (target_type, target_id), columns in deltas.items():
+        columns = {column: delta for column, delta in columns.items() if delta}
+        if not columns:
+            continue
+        params = {'target_id': target_id}
+        params.update({f'd_{column}': delta for column, delta in columns.items()})
+        groups[(target_type, tuple(sorted(columns)))].append(params)
+    
+    for (target_type, columns), params in groups.items():
+        session.execute(_counter_update(target_type, columns), params)
+
+
+class CounterBuffer:
+    """
+    Write-behind buffer for denormalized counters (like/comment/share counts).
+    Increments are summed in memory and flushed every COUNTER_FLUSH_INTERVAL_MS
+    in bulk, so a viral post costs one UPDATE per interval instead of one per
+    interaction. Reads merge in pending deltas (read-your-writes per process).
+    Increments are staged on the session that made them and only enter the
+    buffer once that session commits (dropped on rollback), so a failed
+    request never moves a counter. With COUNTER_WRITE_BEHIND disabled,
+    increments are applied to the current session immediately.
+    """
+    
+    SESSION_KEY = 'counter_deltas'
+    
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.interval = 0.5
+        self._pending = defaultdict(lambda: defaultdict(int))
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+    
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('COUNTER_WRITE_BEHIND', False)
+        self.interval = app.config.get('COUNTER_FLUSH_INTERVAL_MS', 500) / 1000.0
+        app.extensions['counter_buffer'] = self
+        if self.enabled:
+            atexit.register(self.flush)
+            if not event.contains(db.session, 'after_commit', self._on_commit):
+                event.listen(db.session, 'after_commit', self._on_commit)
+                event.listen(db.session, 'after_rollback', self._on_rollback)
+    
+    def add(self, target_type, target_id, column, delta):
+        """Record a counter change as part of the current transaction. Caller commits."""
+        if column not in COUNTER_TARGETS[target_type][1]:
+            raise ValueError(f'Unknown counter {target_type}.{column}')
+        
+        if not self.enabled:
+            apply_counter_deltas(db.session, {(target_type, target_id): {column: delta}})
+            return
+        
+        staged = db.session.info.setdefault(self.SESSION_KEY, defaultdict(lambda: defaultdict(int)))
+        staged[(target_type, target_id)][column] += delta
+    
+    def _on_commit(self, session):
+        """Hand the deltas of a committed transaction to the buffer"""
+        staged = session.info.pop(self.SESSION_KEY, None)
+        if not staged:
+            return
+        with self._lock:
+            for key, columns in staged.items():
+                for column, delta in columns.items():
+                    self._pending[key][column] += delta
+        self._ensure_thread()
+    
+    def _on_rollback(self, session):
+        session.info.pop(self.SESSION_KEY, None)
+    
+    def pending(self, target_type, target_id):
+        """Deltas not yet visible in the database for one target"""
+        key = (target_type, target_id)
+        with self._lock:
+            merged = dict(self._inflight.get(key, {}))
+            for column, delta in self._pending.get(key, {}).items():
+                merged[column] = merged.get(column, 0) + delta
+        return merged
+    
+    def merge(self, target_type, data):
+        """Add pending deltas to a serialized target dict (must contain 'id')"""
+        if not self.enabled:
+            return data
+        for column, delta in self.pending(target_type, data['id']).items():
+            if column in data and data[column] is not None:
+                data[column] = max(0, data[column] + delta)
+        return data
+    
+    def current(self, target_type, target_id, column, stored):
+        """Stored counter value plus its pending delta"""
+        return max(0, (stored or 0) + self.pending(target_type, target_id).get(column, 0))
+    
+    def flush(self):
+        """Write all pending deltas to the database"""
+        if self.app is None:
+            return
+        
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                batch = {key: dict(columns) for key, columns in self._pending.items()}
+                self._inflight = batch
+                self._pending = defaultdict(lambda: defaultdict(int))
+            
+            with self.app.app_context():
+                try:
+                    apply_counter_deltas(db.session, batch)
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Counter flush failed: {e}")
+                    # Put the deltas back so the next flush retries them
+                    with self._lock:
+                        for key, columns in batch.items():
+                            for column, delta in columns.items():
+                                self._pending[key][column] += delta
+                finally:
+                    db.session.remove()
+                    with self._lock:
+                        self._inflight = {}
+    
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='counter-flush', daemon=True)
+            self._thread.start()
+    
+    def _run(self):
+        while not self._wakeup.wait(self.interval):
+            self.flush()
@@ -1,11 +1,16 @@
+import hashlib
 import os
-import uuid
+import tempfile
 from werkzeug.utils import secure_filename
 from flask import current_app
-from PIL import Image
+from PIL import Image, ImageFile
+from models.media_blob import MediaBlob
 
 ALLOWED_IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 ALLOWED_VIDEO_EXTENSIONS = {'mp4', 'avi', 'mov', 'wmv', 'flv', 'webm'}
+STREAM_BUFFER_SIZE = 1024 * 1024
+HEADER_FEED_SIZE = 16 * 1024
+HEADER_MAX_SIZE = 1024 * 1024  # Give up on dimensions if no header parsed within this prefix
 
 def allowed_file(filename, file_type='image'):
     """Check if file extension is allowed"""
@@ -22,138 +27,207 @@ def allowed_file(filename, file_type='image'):
         return ext in (ALLOWED_IMAGE_EXTENSIONS | ALLOWED_VIDEO_EXTENSIONS)
 
 
-def upload_file(file, folder='uploads'):
+class UploadDigest:
     """
-    Upload file to local storage
-    Returns: URL of uploaded file
-    TODO: Implement AWS S3 upload in production
+    Everything learned from one pass over the uploaded bytes: content hash,
+    size and, for images, the dimensions from the header (fed to Pillow's
+    incremental parser only until the header is complete, so nothing is
+    decoded twice and the file is never reopened). The parser re-reads its
+    whole buffer on every feed, so it only ever sees the first
+    HEADER_MAX_SIZE bytes; the pipeline fills in the rest for odd files.
     """
+    
+    def __init__(self, ext):
+        self.hash = hashlib.blake2b(digest_size=32)
+        self.file_size = 0
+        self.width = None
+        self.height = None
+        self._parser = ImageFile.Parser() if ext in ALLOWED_IMAGE_EXTENSIONS else None
+    
+    def update(self, chunk):
+        self.hash.update(chunk)
+        self.file_size += len(chunk)
+        
+        if self._parser is not None:
+            offset = self.file_size - len(chunk)
+            try:
+                for start in range(0, min(len(chunk), HEADER_MAX_SIZE - offset), HEADER_FEED_SIZE):
+                    end = min(start + HEADER_FEED_SIZE, HEADER_MAX_SIZE - offset)
+                    self._parser.feed(chunk[start:end])
+                    if self._parser.image is not None:
+                        self.width, self.height = self._parser.image.size
+                        self._parser = None
+                        break
+            except Exception:
+                self._parser = None  # Not a readable image; the pipeline will report it
+            
+            if self._parser is not None and self.file_size >= HEADER_MAX_SIZE:
+                self._parser = None  # No header within the budget
+    
+    def info(self):
+        return {'file_size': self.file_size, 'width': self.width, 'height': self.height}
+
+
+def save_upload(file, folder='uploads'):
+    """
+    Store an uploaded file under its content hash (<folder>/<aa>/<hash>.<ext>)
+    The file is hashed while it streams to disk; if the same bytes were
+    uploaded before, the copy is dropped and the existing blob is reused.
+    Caller commits (the blob reference is taken in the current session).
+    Returns: (file_url, file_path, is_new, info) with info = {file_size, width, height} as uploaded
+    """
+    if not file or file.filename == '':
+        raise ValueError("No file provided")
+    
+    # Secure the filename
+    original_filename = secure_filename(file.filename)
+    ext = original_filename.rsplit('.', 1)[1].lower()
+    
+    # Create upload directory if not exists
+    upload_folder = os.path.join(current_app.config['UPLOAD_FOLDER'], folder)
+    os.makedirs(upload_folder, exist_ok=True)
+    
+    # Stream to a temporary file, hashing as we go
+    digest = UploadDigest(ext)
+    with tempfile.NamedTemporaryFile(dir=upload_folder, suffix='.part', delete=False) as tmp:
+        for chunk in iter(lambda: file.stream.read(STREAM_BUFFER_SIZE), b''):
+            digest.update(chunk)
+            tmp.write(chunk)
+    
+    return store_file(tmp.name, ext, folder, digest)
+
+
+def store_file(temp_path, ext, folder, digest=None):
+    """
+    Move a completely received temporary file into content-addressed storage
+    (consumes temp_path, which must be on the same filesystem as UPLOAD_FOLDER)
+    digest: UploadDigest of the file, computed by reading it when not already known
+    Returns: (file_url, file_path, is_new, info)
+    """
+    upload_root = current_app.config['UPLOAD_FOLDER']
+    
     try:
-        if not file or file.filename == '':
-            raise ValueError("No file provided")
-        
-        # Secure the filename
-        original_filename = secure_filename(file.filename)
-        ext = original_filename.rsplit('.', 1)[1].lower()
-        
-        # Generate unique filename
-        unique_filename = f"{uuid.uuid4().hex}.{ext}"
-        
-        # Create upload directory if not exists
-        upload_folder = os.path.join(current_app.config['UPLOAD_FOLDER'], folder)
-        os.makedirs(upload_folder, exist_ok=True)
-        
-        # Save file
-        file_path = os.path.join(upload_folder, unique_filename)
-        file.save(file_path)
-        
-        # If image, optionally resize/optimize
-        if ext in ALLOWED_IMAGE_EXTENSIONS:
-            optimize_image(file_path)
-        
-        # Return relative URL
-        file_url = f"/uploads/{folder}/{unique_filename}"
-        return file_url
-        
-    except Exception as e:
-        raise Exception(f"File upload failed: {str(e)}")
+        if digest is None:
+            digest = UploadDigest(ext)
+            with open(temp_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(STREAM_BUFFER_SIZE), b''):
+                    digest.update(chunk)
+        
+        content_hash = digest.hash.hexdigest()
+        file_url, is_new = MediaBlob.acquire(
+            content_hash,
+            f"/uploads/{folder}/{content_hash[:2]}/{content_hash}.{ext}",
+            digest.file_size
+        )
+        file_path = os.path.join(upload_root, file_url.replace('/uploads/', '', 1))
+        
+        if is_new:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            try:
+                # Never overwrite: the blob may already be processed in place
+                os.link(temp_path, file_path)
+            except FileExistsError:
+                pass
+    finally:
+        os.remove(temp_path)
+    
+    return file_url, file_path, is_new, digest.info()
 
 
-def optimize_image(file_path, max_width=1920, max_height=1080, quality=85):
-    """Optimize image size and quality"""
+def optimize_image(file_path, max_width=1920, max_height=1080, quality=85, variant_widths=()):
+    """
+    Optimize image size and quality (in place)
+    variant_widths: also write downscaled WebP + JPEG copies next to the file
+    (<name>_<width>.webp / .jpg) for every width smaller than the result
+    Returns: {width, height, file_size, variants} of the result, None if the image could not be processed
+    Runs in media pipeline worker processes, so it must not touch the app or database.
+    """
     try:
         with Image.open(file_path) as img:
+            image_format = img.format
+            
+            # Let the JPEG decoder downscale by 1/2, 1/4 or 1/8 while decoding
+            img.draft('RGB', (max_width, max_height))
+            img.load()
+            
             # Convert RGBA to RGB if necessary
-            if img.mode == 'RGBA':
+            if img.mode == 'RGBA' or (image_format == 'JPEG' and img.mode not in ('RGB', 'L')):
                 img = img.convert('RGB')
             
             # Resize if too large
             if img.width > max_width or img.height > max_height:
                 img.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
             
-            # Save with optimization
-            img.save(file_path, optimize=True, quality=quality)
+            # Save with optimization (swap in atomically, the file may already be served)
+            img.save(f"{file_path}.tmp", format=image_format, optimize=True, quality=quality)
+            os.replace(f"{file_path}.tmp", file_path)
+            width, height = img.size
             
-    except Exception as e:
-        print(f"Image optimization failed: {e}")
-
-
-def delete_file(file_url):
-    """Delete file from storage"""
-    try:
-        if not file_url:
-            return False
-        
-        # Extract file path from URL
-        file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], file_url.replace('/uploads/', ''))
-        
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            return True
-        
-        return False
-        
-    except Exception as e:
-        print(f"File deletion failed: {e}")
-        return False
-
-
-def get_file_info(file):
-    """Get file metadata"""
-    try:
-        file_size = 0
-        file.seek(0, os.SEEK_END)
-        file_size = file.tell()
-        file.seek(0)
-        
-        width, height, duration = None, None, None
-        
-        ext = file.filename.rsplit('.', 1)[1].lower()
-        if ext in ALLOWED_IMAGE_EXTENSIONS:
-            with Image.open(file) as img:
-                width, height = img.size
+            variants = _save_variants(img, file_path, variant_widths, quality)
         
         return {
-            'file_size': file_size,
             'width': width,
             'height': height,
-            'duration': duration
+            'file_size': os.path.getsize(file_path),
+            'variants': variants
         }
-        
+    
     except Exception as e:
-        print(f"Failed to get file info: {e}")
-        return {}
+        print(f"Image optimization failed: {e}")
+        return None
 
 
-# TODO: AWS S3 Upload (for production)
-def upload_to_s3(file, folder='uploads'):
-    """Upload file to AWS S3"""
-    import boto3
-    from botocore.exceptions import NoCredentialsError
+def _save_variants(img, file_path, widths, quality):
+    """
+    Write the responsive variants of an already decoded image
+    Returns: [{width, height, webp, jpeg}] with file names, smallest first
+    """
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    
+    base = file_path.rsplit('.', 1)[0]
+    variants = []
+    source = img
+    
+    # Largest first so every step downscales the previous (already smaller) variant
+    for width in sorted({w for w in widths if w < img.width}, reverse=True):
+        height = max(1, round(img.height * width / img.width))
+        # reducing_gap: cheap integer reduce() before the final LANCZOS pass
+        source = source.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=2.0)
+        
+        source.save(f"{base}_{width}.webp", 'WEBP', quality=quality, method=4)
+        source.save(f"{base}_{width}.jpg", 'JPEG', quality=quality, optimize=True, progressive=True)
+        variants.append({
+            'width': width,
+            'height': height,
+            'webp': os.path.basename(f"{base}_{width}.webp"),
+            'jpeg': os.path.basename(f"{base}_{width}.jpg")
+        })
+    
+    variants.reverse()
+    return variants
+
+
+def delete_file(file_url):
+    """
+    Delete a stored file that is no longer used: the file (and its variants)
+    is removed from disk and the storage backend after the caller commits.
+    Content-addressed blobs may be shared with other uploads and are left to
+    cleanup_orphaned_uploads. Caller commits.
+    Returns: True if the file will be removed
+    """
+    from extensions import storage
     
     try:
-        s3_client = boto3.client(
-            's3',
-            aws_access_key_id=current_app.config['AWS_ACCESS_KEY_ID'],
-            aws_secret_access_key=current_app.config['AWS_SECRET_ACCESS_KEY'],
-            region_name=current_app.config['AWS_REGION']
-        )
-        
-        original_filename = secure_filename(file.filename)
-        ext = original_filename.rsplit('.', 1)[1].lower()
-        unique_filename = f"{folder}/{uuid.uuid4().hex}.{ext}"
-        
-        s3_client.upload_fileobj(
-            file,
-            current_app.config['AWS_S3_BUCKET'],
-            unique_filename,
-            ExtraArgs={'ACL': 'public-read'}
-        )
+        if not file_url or not file_url.startswith('/uploads/'):
+            return False
         
-        file_url = f"https://{current_app.config['AWS_S3_BUCKET']}.s3.{current_app.config['AWS_REGION']}.amazonaws.com/{unique_filename}"
-        return file_url
+        if MediaBlob.query.filter_by(media_url=file_url).first():
+            return False  # Collected by the sweeper once nothing refers to it
         
-    except NoCredentialsError:
-        raise Exception("AWS credentials not available")
+        storage.discard(file_url)
+        return True
+    
     except Exception as e:
-        raise Exception(f"S3 upload failed: {str(e)}")
+        print(f"File deletion failed: {e}")
+        return False
@@ -0,0 +1,199 @@
+import os
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from models import db
+from models.media_upload import MediaUpload
+from models.post_media import PostMedia
+from utils.file_upload import optimize_image
+from utils.video_transcode import transcode_video
+from utils.cache import invalidate_post
+
+
+def media_url_for(media_url, relative_path):
+    """URL of a file the worker wrote next to media_url"""
+    if not relative_path:
+        return None
+    return f"{media_url.rsplit('/', 1)[0]}/{relative_path}"
+
+
+def variant_urls(media_url, variants):
+    """Turn the relative paths returned by the workers into URLs next to media_url"""
+    if not variants:
+        return None
+    return [
+        {key: media_url_for(media_url, value) if key in ('webp', 'jpeg', 'hls') else value
+         for key, value in variant.items()}
+        for variant in variants
+    ]
+
+
+class MediaPipeline:
+    """
+    Background processing for uploaded media.
+    The request handler only streams the file to disk and records a
+    MediaUpload row; decoding, resizing and re-encoding run in a process
+    pool so CPU-bound Pillow work never blocks a web worker. When the pool
+    already has MEDIA_MAX_PENDING jobs queued, or MEDIA_ASYNC_PROCESSING is
+    disabled, the job runs inline on the request thread instead.
+    Videos are transcoded to HLS with ffmpeg (if installed) in a separate
+    pool of MEDIA_TRANSCODE_WORKERS, so long transcodes never hold up image
+    jobs. They take far too long to run inline: once MEDIA_MAX_PENDING_TRANSCODES
+    videos are queued, further videos are kept as uploaded (no HLS ladder).
+    """
+    
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.workers = 2
+        self.transcode_workers = 1
+        self.variant_widths = ()
+        self.ffmpeg = None
+        self.ffprobe = None
+        self.renditions = ()
+        self.transcode_timeout = 1800
+        self._executors = {}
+        self._slots = {}
+        self._lock = threading.Lock()
+    
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('MEDIA_ASYNC_PROCESSING', False)
+        self.workers = app.config.get('MEDIA_WORKERS', 2)
+        self.transcode_workers = app.config.get('MEDIA_TRANSCODE_WORKERS', 1)
+        self.variant_widths = tuple(app.config.get('MEDIA_VARIANT_WIDTHS', ()))
+        self.ffmpeg = shutil.which(app.config.get('MEDIA_FFMPEG', 'ffmpeg'))
+        self.ffprobe = shutil.which(app.config.get('MEDIA_FFPROBE', 'ffprobe'))
+        self.renditions = tuple(app.config.get('MEDIA_HLS_RENDITIONS', ()))
+        self.transcode_timeout = app.config.get('MEDIA_TRANSCODE_TIMEOUT', 1800)
+        self._slots = {
+            'image': threading.BoundedSemaphore(app.config.get('MEDIA_MAX_PENDING', 32)),
+            'video': threading.BoundedSemaphore(app.config.get('MEDIA_MAX_PENDING_TRANSCODES', 4))
+        }
+        app.extensions['media_pipeline'] = self
+    
+    def submit(self, upload_id, file_path, media_type, variants=True):
+        """
+        Process a saved upload and record the result on its MediaUpload row
+        variants: also generate the responsive copies (MEDIA_VARIANT_WIDTHS images,
+        HLS renditions for videos)
+        """
+        if media_type == 'image':
+            kind, worker = 'image', optimize_image
+            options = {'variant_widths': self.variant_widths if variants else ()}
+        elif variants and self.ffmpeg and self.ffprobe and self.renditions:
+            kind, worker = 'video', transcode_video
+            options = {
+                'ffmpeg': self.ffmpeg,
+                'ffprobe': self.ffprobe,
+                'renditions': self.renditions,
+                'timeout': self.transcode_timeout
+            }
+        else:
+            # Videos are stored as uploaded
+            self._finish(upload_id, {'file_size': os.path.getsize(file_path)})
+            return
+        
+        if not self.enabled:
+            self._finish(upload_id, worker(file_path, **options))
+            return
+        
+        if not self._slots[kind].acquire(blocking=False):
+            if kind == 'image':
+                # Image pool is backed up: process on the request thread
+                self._finish(upload_id, worker(file_path, **options))
+            else:
+                print(f"Transcode queue full, keeping upload {upload_id} as uploaded")
+                self._finish(upload_id, {'file_size': os.path.getsize(file_path)})
+            return
+        
+        try:
+            future = self._get_executor(kind).submit(worker, file_path, **options)
+        except Exception:
+            self._slots[kind].release()
+            raise
+        future.add_done_callback(lambda done: self._on_done(upload_id, done, kind))
+    
+    def shutdown(self, wait=True):
+        with self._lock:
+            for executor in self._executors.values():
+                executor.shutdown(wait=wait)
+            self._executors = {}
+    
+    def _get_executor(self, kind):
+        """Process pool of a job kind ('image' or 'video')"""
+        executor = self._executors.get(kind)
+        if executor is None:
+            with self._lock:
+                executor = self._executors.get(kind)
+                if executor is None:
+                    workers = self.workers if kind == 'image' else self.transcode_workers
+                    executor = self._executors[kind] = ProcessPoolExecutor(max_workers=workers)
+        return executor
+    
+    def _on_done(self, upload_id, future, kind):
+        self._slots[kind].release()
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"Media processing failed: {e}")
+            result = None
+        
+        with self.app.app_context():
+            try:
+                self._finish(upload_id, result)
+            finally:
+                db.session.remove()
+    
+    def _finish(self, upload_id, result):
+        """Mark the upload ready (or failed) and copy its metadata to attached post media"""
+        try:
+            upload = db.session.get(MediaUpload, upload_id)
+            if not upload:
+                return
+            
+            post_ids = []
+            
+            if result is None:
+                upload.status = 'failed'
+                upload.error = 'Could not process media file'
+            else:
+                upload.status = 'ready'
+                upload.width = result.get('width')
+                upload.height = result.get('height')
+                upload.duration = result.get('duration')
+                upload.file_size = result.get('file_size')
+                upload.variants = variant_urls(upload.media_url, result.get('variants'))
+                upload.poster_url = media_url_for(upload.media_url, result.get('poster'))
+                upload.stream_url = media_url_for(upload.media_url, result.get('stream'))
+                
+                # The post may have been created while the file was processing
+                attached = PostMedia.query.filter_by(media_url=upload.media_url)
+                post_ids = [row.post_id for row in attached.with_entities(PostMedia.post_id)]
+                if post_ids:
+                    attached.update(upload.media_fields(), synchronize_session=False)
+            
+            upload.processed_at = datetime.utcnow()
+            
+            # Duplicate uploads of the same content that arrived while it was processing
+            MediaUpload.query.filter(
+                MediaUpload.media_url == upload.media_url,
+                MediaUpload.status == 'processing',
+                MediaUpload.id != upload.id
+            ).update({
+                field: getattr(upload, field) for field in MediaUpload.PROCESSED_FIELDS
+            }, synchronize_session=False)
+            
+            db.session.commit()
+            
+            for post_id in post_ids:
+                invalidate_post(post_id)
+            
+            if upload.status == 'ready':
+                from extensions import storage
+                storage.publish(upload.media_url)
+        
+        except Exception as e:
+            db.session.rollback()
+            print(f"Failed to record media processing result: {e}")
@@ -0,0 +1,90 @@
+import mimetypes
+import os
+import re
+from flask import abort, current_app, redirect, request
+from werkzeug.security import safe_join
+from werkzeug.utils import send_from_directory
+from extensions import storage
+from models import db
+from models.media_blob import MediaBlob
+from models.media_upload import MediaUpload
+
+# Content-addressed blob (<hash>.<ext>) or a file derived from it
+# (<hash>_<width>.<ext>, <hash>_poster.jpg, <hash>_hls/<segment>.<ext>)
+FINGERPRINTED_NAME = re.compile(r'(?:^|/)(?P<hash>[0-9a-f]{64})(?P<variant>_\w+(?:/[\w-]+)?)?\.\w+$')
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def _processing(content_hash):
+    """Whether an upload of the blob is still being processed (the file is optimized in place)"""
+    return db.session.query(MediaUpload.id).join(
+        MediaBlob, MediaBlob.media_url == MediaUpload.media_url
+    ).filter(
+        MediaBlob.content_hash == content_hash,
+        MediaUpload.status == 'processing'
+    ).first() is not None
+
+
+def send_upload(uploads_dir, filename):
+    """
+    Serve a stored upload.
+    Range requests (206) and If-None-Match / If-Range are handled by
+    Werkzeug's conditional send_file. Content-addressed names get a strong
+    ETag from their hash and are cached as immutable once processing is done;
+    legacy names keep the default mtime-based ETag. With MEDIA_OFFLOAD set, the response only
+    carries X-Sendfile / X-Accel-Redirect and the web server streams the bytes.
+    """
+    file_path = safe_join(uploads_dir, filename)
+    if file_path is None:
+        abort(404)
+    
+    # Chunks of resumable uploads in progress are not public
+    relative = os.path.relpath(file_path, uploads_dir).replace(os.sep, '/')
+    if relative == 'tmp' or relative.startswith('tmp/'):
+        abort(404)
+    
+    if not os.path.isfile(file_path):
+        # Only kept in the storage backend
+        if storage.remote:
+            return redirect(storage.url_for(filename), code=302)
+        abort(404)
+    
+    stat = os.stat(file_path)
+    match = FINGERPRINTED_NAME.search(filename)
+    etag = True
+    immutable = False
+    if match:
+        # The hash names the uploaded bytes; mtime tells the pre/post-optimization versions apart
+        etag = f"{match.group('hash')}{match.group('variant') or ''}-{stat.st_mtime_ns:x}"
+        immutable = not _processing(match.group('hash'))
+    
+    offload = current_app.config.get('MEDIA_OFFLOAD')
+    if offload == 'x-accel':
+        response = current_app.response_class(
+            mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        )
+        response.headers['X-Accel-Redirect'] = current_app.config.get('MEDIA_ACCEL_PREFIX', '/protected-uploads/') + filename
+        if match:
+            response.set_etag(etag)
+    else:
+        response = send_from_directory(
+            uploads_dir,
+            filename,
+            request.environ,
+            etag=etag,
+            conditional=True,
+            use_x_sendfile=offload == 'x-sendfile',
+            response_class=current_app.response_class
+        )
+    
+    if immutable:
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    
+    response.headers['Accept-Ranges'] = 'bytes'
+    return response
@@ -0,0 +1,62 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(created_at, row_id):
+    """Encode a (created_at, id) keyset position as an opaque cursor string"""
+    payload = json.dumps([created_at.isoformat() if created_at else None, row_id])
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor
+    Returns: (created_at, id)
+    Raises: ValueError if the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def apply_keyset(query, created_column, id_column, cursor=None, descending=True):
+    """
+    Order query by (created_column, id_column) and seek past the cursor position.
+    Uses a row comparison instead of OFFSET so every page costs the same
+    index range scan regardless of depth.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        if descending:
+            query = query.filter(or_(
+                created_column < created_at,
+                and_(created_column == created_at, id_column < row_id)
+            ))
+        else:
+            query = query.filter(or_(
+                created_column > created_at,
+                and_(created_column == created_at, id_column > row_id)
+            ))
+    
+    if descending:
+        return query.order_by(created_column.desc(), id_column.desc())
+    return query.order_by(created_column.asc(), id_column.asc())
+
+
+def keyset_page(query, limit, created_attr='created_at', id_attr='id'):
+    """
+    Fetch one keyset page (limit + 1 rows to detect more results)
+    Returns: (items, next_cursor)
+    """
+    rows = query.limit(limit + 1).all()
+    items = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit and items:
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, created_attr), getattr(last, id_attr))
+    return items, next_cursor
@@ -0,0 +1,8 @@
+from sqlalchemy import insert
+
+
+def insert_ignore(model):
+    """INSERT that skips rows hitting a unique key (MySQL IGNORE / SQLite OR IGNORE)"""
+    return insert(model.__table__)\
+        .prefix_with('IGNORE', dialect='mysql')\
+        .prefix_with('OR IGNORE', dialect='sqlite')
@@ -0,0 +1,271 @@
+import glob
+import mimetypes
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import event
+from models import db
+
+
+class LocalStorage:
+    """Files stay in UPLOAD_FOLDER and are served by the app (/uploads/<key>)"""
+    
+    remote = False
+    
+    def url_for(self, key):
+        return f'/uploads/{key}'
+    
+    def upload(self, local_path, key):
+        pass
+    
+    def delete(self, keys):
+        pass
+    
+    def delete_prefix(self, prefix):
+        pass
+
+
+class S3Storage:
+    """
+    S3-compatible object storage (AWS S3, MinIO, ...).
+    One boto3 client is created lazily and shared by every thread (its
+    connection pool is sized for the storage executor); large files go
+    through boto3's managed transfer, which splits them into concurrent
+    multipart uploads.
+    """
+    
+    remote = True
+    
+    def __init__(self, bucket, region=None, endpoint_url=None, public_url=None,
+                 access_key=None, secret_key=None, max_connections=10,
+                 multipart_threshold=8 * 1024 * 1024, multipart_chunksize=8 * 1024 * 1024,
+                 max_concurrency=8):
+        self.bucket = bucket
+        self.region = region
+        self.endpoint_url = endpoint_url
+        self.public_url = public_url
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.max_connections = max_connections
+        self.multipart_threshold = multipart_threshold
+        self.multipart_chunksize = multipart_chunksize
+        self.max_concurrency = max_concurrency
+        self._client = None
+        self._transfer_config = None
+        self._lock = threading.Lock()
+    
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import boto3
+                    from boto3.s3.transfer import TransferConfig
+                    from botocore.config import Config as BotoConfig
+                    
+                    self._transfer_config = TransferConfig(
+                        multipart_threshold=self.multipart_threshold,
+                        multipart_chunksize=self.multipart_chunksize,
+                        max_concurrency=self.max_concurrency,
+                        use_threads=True
+                    )
+                    self._client = boto3.client(
+                        's3',
+                        region_name=self.region,
+                        endpoint_url=self.endpoint_url,
+                        aws_access_key_id=self.access_key,
+                        aws_secret_access_key=self.secret_key,
+                        config=BotoConfig(max_pool_connections=self.max_connections, retries={'mode': 'standard'})
+                    )
+        return self._client
+    
+    def url_for(self, key):
+        if self.public_url:
+            return f"{self.public_url.rstrip('/')}/{key}"
+        if self.endpoint_url:
+            return f"{self.endpoint_url.rstrip('/')}/{self.bucket}/{key}"
+        return f'https://{self.bucket}.s3.{self.region}.amazonaws.com/{key}'
+    
+    def upload(self, local_path, key):
+        content_type = mimetypes.guess_type(local_path)[0] or 'application/octet-stream'
+        self.client.upload_file(
+            local_path,
+            self.bucket,
+            key,
+            ExtraArgs={
+                'ContentType': content_type,
+                # Keys are content-addressed, so objects never change
+                'CacheControl': 'public, max-age=31536000, immutable'
+            },
+            Config=self._transfer_config
+        )
+    
+    def delete(self, keys):
+        keys = list(keys)
+        # DeleteObjects takes at most 1000 keys per request
+        for start in range(0, len(keys), 1000):
+            self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={'Objects': [{'Key': key} for key in keys[start:start + 1000]], 'Quiet': True}
+            )
+    
+    def delete_prefix(self, prefix):
+        keys = []
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            keys.extend(item['Key'] for item in page.get('Contents', []))
+        if keys:
+            self.delete(keys)
+
+
+class Storage:
+    """
+    Where uploaded media lives, selected by STORAGE_BACKEND ('local' or 's3').
+    Files are always received and processed in UPLOAD_FOLDER and referenced
+    by their /uploads/<key> URL; with a remote backend they are then copied
+    to the bucket by a background executor (and optionally removed locally),
+    and /uploads/<key> redirects to the object once the local copy is gone.
+    """
+    
+    SESSION_KEY = 'discarded_files'
+    
+    def __init__(self):
+        self.app = None
+        self.backend = LocalStorage()
+        self.keep_local = True
+        self.workers = 4
+        self._executor = None
+        self._lock = threading.Lock()
+    
+    def init_app(self, app):
+        self.app = app
+        self.keep_local = app.config.get('STORAGE_KEEP_LOCAL', True)
+        self.workers = app.config.get('STORAGE_WORKERS', 4)
+        
+        if app.config.get('STORAGE_BACKEND', 'local') == 's3':
+            self.backend = S3Storage(
+                bucket=app.config['AWS_S3_BUCKET'],
+                region=app.config.get('AWS_REGION'),
+                endpoint_url=app.config.get('AWS_S3_ENDPOINT_URL'),
+                public_url=app.config.get('STORAGE_PUBLIC_URL'),
+                access_key=app.config.get('AWS_ACCESS_KEY_ID'),
+                secret_key=app.config.get('AWS_SECRET_ACCESS_KEY'),
+                max_connections=self.workers * app.config.get('STORAGE_MAX_CONCURRENCY', 8),
+                multipart_threshold=app.config.get('STORAGE_MULTIPART_THRESHOLD', 8 * 1024 * 1024),
+                multipart_chunksize=app.config.get('STORAGE_MULTIPART_CHUNK_SIZE', 8 * 1024 * 1024),
+                max_concurrency=app.config.get('STORAGE_MAX_CONCURRENCY', 8)
+            )
+        else:
+            self.backend = LocalStorage()
+        
+        app.extensions['storage'] = self
+        if not event.contains(db.session, 'after_commit', self._on_commit):
+            event.listen(db.session, 'after_commit', self._on_commit)
+            event.listen(db.session, 'after_rollback', self._on_rollback)
+    
+    @property
+    def remote(self):
+        return self.backend.remote
+    
+    def key_for(self, file_url):
+        """Storage key of an /uploads/... URL"""
+        return file_url.replace('/uploads/', '', 1)
+    
+    def url_for(self, key):
+        return self.backend.url_for(key)
+    
+    def publish(self, file_url):
+        """
+        Copy a stored file and everything derived from it (image variants,
+        video poster/HLS) to the backend in the background
+        Returns: Future, or None with local storage
+        """
+        if not self.remote:
+            return None
+        return self._get_executor().submit(self._publish, file_url)
+    
+    def remove(self, file_url):
+        """Delete a file and its derived files from the backend in the background"""
+        if not self.remote:
+            return None
+        return self._get_executor().submit(self._remove, file_url)
+    
+    def discard(self, file_url):
+        """
+        Delete a file and its derived files, locally and from the backend,
+        once the current transaction commits (nothing happens on rollback)
+        """
+        db.session.info.setdefault(self.SESSION_KEY, []).append(file_url)
+    
+    def _on_commit(self, session):
+        for file_url in session.info.pop(self.SESSION_KEY, []):
+            try:
+                self._delete_local(file_url)
+                self.remove(file_url)
+            except Exception as e:
+                print(f"File deletion failed for {file_url}: {e}")
+    
+    def _on_rollback(self, session):
+        session.info.pop(self.SESSION_KEY, None)
+    
+    def _delete_local(self, file_url):
+        """Remove the file, image variants, video poster and HLS folder from UPLOAD_FOLDER"""
+        base = os.path.join(self.upload_folder, self.key_for(file_url)).rsplit('.', 1)[0]
+        for path in self._local_files(file_url):
+            os.remove(path)
+        for path in glob.glob(glob.escape(base) + '_*'):
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+    
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+    
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='storage')
+        return self._executor
+    
+    @property
+    def upload_folder(self):
+        return self.app.config['UPLOAD_FOLDER']
+    
+    def _local_files(self, file_url):
+        file_path = os.path.join(self.upload_folder, self.key_for(file_url))
+        base = file_path.rsplit('.', 1)[0]
+        paths = [file_path] + glob.glob(glob.escape(base) + '_*')
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                for root, _, names in os.walk(path):
+                    files.extend(os.path.join(root, name) for name in names)
+            elif os.path.isfile(path):
+                files.append(path)
+        return files
+    
+    def _publish(self, file_url):
+        try:
+            files = self._local_files(file_url)
+            for path in files:
+                self.backend.upload(path, os.path.relpath(path, self.upload_folder).replace(os.sep, '/'))
+            
+            if not self.keep_local:
+                for path in files:
+                    os.remove(path)
+        except Exception as e:
+            print(f"Storage upload failed for {file_url}: {e}")
+            raise
+    
+    def _remove(self, file_url):
+        try:
+            key = self.key_for(file_url)
+            self.backend.delete([key])
+            self.backend.delete_prefix(key.rsplit('.', 1)[0] + '_')
+        except Exception as e:
+            print(f"Storage delete failed for {file_url}: {e}")
+            raise
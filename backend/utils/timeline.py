@@ -0,0 +1,140 @@
+from flask import current_app
+from sqlalchemy import or_
+from models import db
+from models.home_timeline import HomeTimeline
+from models.friendship import Friendship
+from models.post import Post
+from models.user import User
+from utils.pagination import apply_keyset, encode_cursor
+from utils.sql import insert_ignore
+
+FANOUT_BATCH_SIZE = 1000
+
+
+def _friend_ids(user_id):
+    """Accepted friends of a user (served by idx_user_friends)"""
+    rows = db.session.query(Friendship.friend_id).filter(
+        Friendship.user_id == user_id,
+        Friendship.status == 'accepted'
+    ).all()
+    return [row.friend_id for row in rows]
+
+
+def _insert_entries(post, user_ids):
+    """Bulk insert timeline entries for a post, ignoring ones that already exist"""
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), FANOUT_BATCH_SIZE):
+        rows = [
+            {
+                'user_id': user_id,
+                'post_id': post.id,
+                'author_id': post.user_id,
+                'created_at': post.created_at
+            }
+            for user_id in user_ids[start:start + FANOUT_BATCH_SIZE]
+        ]
+        db.session.execute(insert_ignore(HomeTimeline), rows)
+
+
+def fan_out_post(post):
+    """
+    Push a newly published post into the author's and friends' home timelines.
+    Authors above TIMELINE_FANOUT_LIMIT are skipped and merged in at read time.
+    Caller commits.
+    """
+    if not post.is_published():
+        return
+    
+    recipients = [post.user_id]
+    
+    if post.visibility != 'private':
+        author = User.query.get(post.user_id)
+        fanout_limit = current_app.config.get('TIMELINE_FANOUT_LIMIT', 1000)
+        if author and (author.friend_count or 0) <= fanout_limit:
+            recipients.extend(_friend_ids(post.user_id))
+    
+    _insert_entries(post, recipients)
+
+
+def _backfill(user_id, author_id):
+    """Copy an author's recent visible posts into a new friend's timeline"""
+    limit = current_app.config.get('TIMELINE_BACKFILL_POSTS', 50)
+    posts = Post.query.filter(
+        Post.user_id == author_id,
+        Post.status == 'published',
+        Post.is_deleted == False,
+        Post.visibility != 'private'
+    ).order_by(Post.created_at.desc()).limit(limit).all()
+    
+    for post in posts:
+        _insert_entries(post, [user_id])
+
+
+def on_friendship_accepted(user_id, friend_id):
+    """Update friend counts and backfill both timelines. Caller commits."""
+    User.query.filter(User.id.in_([user_id, friend_id])).update(
+        {User.friend_count: User.friend_count + 1},
+        synchronize_session=False
+    )
+    _backfill(user_id, friend_id)
+    _backfill(friend_id, user_id)
+
+
+def on_friendship_removed(user_id, friend_id):
+    """Drop each user's posts from the other's timeline. Caller commits."""
+    User.query.filter(User.id.in_([user_id, friend_id]), User.friend_count > 0).update(
+        {User.friend_count: User.friend_count - 1},
+        synchronize_session=False
+    )
+    HomeTimeline.query.filter(
+        ((HomeTimeline.user_id == user_id) & (HomeTimeline.author_id == friend_id)) |
+        ((HomeTimeline.user_id == friend_id) & (HomeTimeline.author_id == user_id))
+    ).delete(synchronize_session=False)
+
+
+def get_home_feed(user_id, limit, cursor=None):
+    """
+    Read one page of a user's home feed.
+    Materialized entries are one range read on idx_home_timeline; posts of
+    high-fan-out friends are pulled from idx_user_posts and merged in.
+    Returns: (posts, next_cursor)
+    Raises: ValueError for a malformed cursor
+    """
+    timeline_query = Post.query.join(HomeTimeline, HomeTimeline.post_id == Post.id).filter(
+        HomeTimeline.user_id == user_id,
+        Post.status == 'published',
+        Post.is_deleted == False,
+        or_(Post.visibility != 'private', Post.user_id == user_id)
+    )
+    timeline_query = apply_keyset(timeline_query, HomeTimeline.created_at, HomeTimeline.post_id, cursor)
+    posts = timeline_query.limit(limit + 1).all()
+    
+    # Fan-out-on-read for friends whose posts were not pushed
+    fanout_limit = current_app.config.get('TIMELINE_FANOUT_LIMIT', 1000)
+    high_fanout_ids = [
+        row.id for row in db.session.query(User.id)
+        .join(Friendship, Friendship.friend_id == User.id)
+        .filter(
+            Friendship.user_id == user_id,
+            Friendship.status == 'accepted',
+            User.friend_count > fanout_limit
+        ).all()
+    ]
+    
+    if high_fanout_ids:
+        pulled_query = Post.query.filter(
+            Post.user_id.in_(high_fanout_ids),
+            Post.status == 'published',
+            Post.is_deleted == False,
+            Post.visibility != 'private'
+        )
+        pulled_query = apply_keyset(pulled_query, Post.created_at, Post.id, cursor)
+        seen = {post.id for post in posts}
+        posts.extend(post for post in pulled_query.limit(limit + 1).all() if post.id not in seen)
+        posts.sort(key=lambda post: (post.created_at, post.id), reverse=True)
+    
+    items = posts[:limit]
+    next_cursor = None
+    if len(posts) > limit and items:
+        next_cursor = encode_cursor(items[-1].created_at, items[-1].id)
+    return items, next_cursor
@@ -0,0 +1,127 @@
+import json
+import os
+import shutil
+import subprocess
+
+# (height, video kbps) rungs of the HLS ladder
+DEFAULT_RENDITIONS = ((360, 800), (720, 2800))
+AUDIO_KBPS = 128
+HLS_SEGMENT_SECONDS = 6
+
+
+def probe_video(file_path, ffprobe='ffprobe', timeout=60):
+    """
+    Read dimensions and duration of the first video stream
+    Returns: {width, height, duration}, None if the file is not a readable video
+    """
+    try:
+        result = subprocess.run(
+            [ffprobe, '-v', 'error', '-select_streams', 'v:0',
+             '-show_entries', 'stream=width,height:format=duration',
+             '-of', 'json', file_path],
+            capture_output=True, check=True, timeout=timeout
+        )
+        info = json.loads(result.stdout)
+        stream = info['streams'][0]
+        return {
+            'width': int(stream['width']),
+            'height': int(stream['height']),
+            'duration': float(info.get('format', {}).get('duration') or 0)
+        }
+    except Exception as e:
+        print(f"Video probe failed: {e}")
+        return None
+
+
+def _even(value):
+    return max(2, int(round(value / 2.0)) * 2)
+
+
+def transcode_video(file_path, ffmpeg='ffmpeg', ffprobe='ffprobe', renditions=DEFAULT_RENDITIONS, timeout=1800):
+    """
+    Transcode a video to an HLS ladder and extract a poster frame
+    Writes <name>_poster.jpg and <name>_hls/{master.m3u8, <h>p.m3u8, <h>p_NNN.ts}
+    next to the file. Rungs (short-side sizes) larger than the source are
+    skipped; a source smaller than every rung gets one rendition at its own size.
+    Returns: {width, height, duration, file_size, poster, stream, variants}
+    with paths relative to the file's folder; poster/stream are None if
+    ffmpeg failed (the original stays playable). None if the file is not a video.
+    Runs in media pipeline worker processes, so it must not touch the app or database.
+    """
+    info = probe_video(file_path, ffprobe)
+    if info is None:
+        return None
+    
+    width, height, duration = info['width'], info['height'], info['duration']
+    base = file_path.rsplit('.', 1)[0]
+    name = os.path.basename(base)
+    result = {
+        'width': width,
+        'height': height,
+        'duration': int(round(duration)),
+        'file_size': os.path.getsize(file_path),
+        'poster': None,
+        'stream': None,
+        'variants': None
+    }
+    
+    # Poster frame from one second in (or the middle of very short clips)
+    try:
+        subprocess.run(
+            [ffmpeg, '-y', '-v', 'error', '-ss', f'{min(1.0, duration / 2):.2f}', '-i', file_path,
+             '-frames:v', '1', '-vf', "scale='min(1280,iw)':-2", '-q:v', '3', f'{base}_poster.jpg'],
+            capture_output=True, check=True, timeout=timeout
+        )
+        result['poster'] = f'{name}_poster.jpg'
+    except Exception as e:
+        print(f"Poster extraction failed: {e}")
+    
+    # Rungs are the short side, so portrait videos get the same quality levels
+    short_side = min(width, height)
+    ladder = [rung for rung in renditions if rung[0] <= short_side] or [(_even(short_side), renditions[0][1])]
+    hls_dir = f'{base}_hls'
+    os.makedirs(hls_dir, exist_ok=True)
+    
+    variants = []
+    try:
+        for rung, kbps in ladder:
+            if width >= height:
+                rung_width, rung_height = _even(width * rung / height), rung
+            else:
+                rung_width, rung_height = rung, _even(height * rung / width)
+            subprocess.run(
+                [ffmpeg, '-y', '-v', 'error', '-i', file_path,
+                 '-map', '0:v:0', '-map', '0:a:0?',
+                 '-vf', f'scale={rung_width}:{rung_height}',
+                 '-c:v', 'libx264', '-preset', 'veryfast', '-profile:v', 'main', '-pix_fmt', 'yuv420p',
+                 '-b:v', f'{kbps}k', '-maxrate', f'{int(kbps * 1.07)}k', '-bufsize', f'{kbps * 2}k',
+                 '-force_key_frames', f'expr:gte(t,n_forced*{HLS_SEGMENT_SECONDS})',
+                 '-c:a', 'aac', '-b:a', f'{AUDIO_KBPS}k', '-ac', '2',
+                 '-hls_time', str(HLS_SEGMENT_SECONDS), '-hls_playlist_type', 'vod',
+                 '-hls_segment_filename', os.path.join(hls_dir, f'{rung}p_%03d.ts'),
+                 os.path.join(hls_dir, f'{rung}p.m3u8')],
+                capture_output=True, check=True, timeout=timeout
+            )
+            variants.append({
+                'width': rung_width,
+                'height': rung_height,
+                'bandwidth': (kbps + AUDIO_KBPS) * 1000,
+                'hls': f'{name}_hls/{rung}p.m3u8'
+            })
+    except Exception as e:
+        print(f"Video transcoding failed: {e}")
+        shutil.rmtree(hls_dir, ignore_errors=True)
+        return result
+    
+    master = ['#EXTM3U', '#EXT-X-VERSION:3']
+    for variant in variants:
+        master.append(
+            f"#EXT-X-STREAM-INF:BANDWIDTH={variant['bandwidth']},RESOLUTION={variant['width']}x{variant['height']}"
+        )
+        master.append(os.path.basename(variant['hls']))
+    with open(os.path.join(hls_dir, 'master.m3u8'), 'w') as f:
+        f.write('\n'.join(master) + '\n')
+    
+    result['stream'] = f'{name}_hls/master.m3u8'
+    result['variants'] = variants
+    return result
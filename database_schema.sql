@@ -22,6 +22,12 @@ CREATE TABLE users (
     ban_reason TEXT,
     ban_until DATETIME,
     
+    -- Number of accepted friends (fan-out-on-write vs fan-out-on-read)
+    friend_count INT DEFAULT 0,
+    
+    -- Number of unread notifications (badge polling)
+    unread_notification_count INT DEFAULT 0,
+    
     -- Verification
     is_email_verified BOOLEAN DEFAULT FALSE,
     email_verification_token VARCHAR(255),
@@ -34,7 +40,8 @@ CREATE TABLE users (
     INDEX idx_email (email),
     INDEX idx_username (username),
     INDEX idx_oauth (oauth_provider, oauth_id),
-    INDEX idx_account_status (account_status)
+    INDEX idx_account_status (account_status),
+    INDEX idx_avatar_url (avatar_url(255))
 );
 
 -- Table: User Activity Logs
@@ -119,6 +126,8 @@ CREATE TABLE post_media (
     height INT,
     duration INT, -- For videos (seconds)
     file_size BIGINT,
+    variants JSON, -- Responsive copies: images [{width, height, webp, jpeg}], videos [{width, height, bandwidth, hls}]
+    stream_url TEXT, -- Video HLS master playlist
     
     -- AI analysis for this specific media
     ai_nsfw_score DECIMAL(5,2),
@@ -130,7 +139,65 @@ CREATE TABLE post_media (
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     
     FOREIGN KEY (post_id) REFERENCES posts(id) ON DELETE CASCADE,
-    INDEX idx_post_media (post_id, display_order)
+    INDEX idx_post_media (post_id, display_order),
+    INDEX idx_media_url (media_url(255))
+);
+
+-- Table: Media Blobs (content-addressed stored files, shared by duplicate uploads)
+CREATE TABLE media_blobs (
+    id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    content_hash CHAR(64) NOT NULL UNIQUE, -- BLAKE2b-256 of the uploaded bytes
+    media_url VARCHAR(500) NOT NULL UNIQUE,
+    file_size BIGINT, -- Size as uploaded
+    last_acquired_at DATETIME DEFAULT CURRENT_TIMESTAMP, -- Latest upload of this content (sweeper grace period)
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Table: Media Uploads (files waiting to be attached, processed in the background)
+CREATE TABLE media_uploads (
+    id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    user_id BIGINT NOT NULL,
+    media_type ENUM('image', 'video') NOT NULL,
+    media_url VARCHAR(500) NOT NULL,
+    
+    status ENUM('processing', 'ready', 'failed') DEFAULT 'processing',
+    error TEXT,
+    
+    -- Filled in by the processing worker
+    width INT,
+    height INT,
+    duration INT, -- For videos (seconds)
+    file_size BIGINT,
+    variants JSON,
+    poster_url VARCHAR(500), -- Video poster frame
+    stream_url VARCHAR(500), -- Video HLS master playlist
+    
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    processed_at DATETIME,
+    
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    INDEX idx_media_upload_user (user_id),
+    INDEX idx_media_upload_url (media_url)
+);
+
+-- Table: Upload Sessions (resumable chunked uploads in progress)
+CREATE TABLE upload_sessions (
+    id VARCHAR(32) PRIMARY KEY, -- Random token, used in the upload URL
+    user_id BIGINT NOT NULL,
+    target ENUM('post', 'comment') NOT NULL,
+    media_type ENUM('image', 'video') NOT NULL,
+    filename VARCHAR(255) NOT NULL,
+    total_size BIGINT NOT NULL,
+    
+    status ENUM('uploading', 'completed') DEFAULT 'uploading',
+    media_upload_id BIGINT,
+    
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (media_upload_id) REFERENCES media_uploads(id) ON DELETE SET NULL,
+    INDEX idx_upload_session_user (user_id)
 );
 
 -- Table: Comments
@@ -139,9 +206,15 @@ CREATE TABLE comments (
     post_id BIGINT NOT NULL,
     user_id BIGINT NOT NULL,
     parent_comment_id BIGINT, -- For nested comments
+    path VARCHAR(255), -- Materialized path of zero-padded ids, e.g. '0000000012/0000000034/'
+    depth INT DEFAULT 0,
     
     content TEXT NOT NULL,
     
+    -- Attached image/video
+    media_url VARCHAR(500),
+    media_type VARCHAR(10),
+    
     -- AI moderation
     is_blocked BOOLEAN DEFAULT FALSE,
     block_reason TEXT,
@@ -157,7 +230,10 @@ CREATE TABLE comments (
     FOREIGN KEY (parent_comment_id) REFERENCES comments(id) ON DELETE CASCADE,
     
     INDEX idx_post_comments (post_id, created_at),
-    INDEX idx_user_comments (user_id, created_at)
+    INDEX idx_parent_created (parent_comment_id, created_at, id), -- Reply pages
+    INDEX idx_comment_path (post_id, path), -- Subtree range scans
+    INDEX idx_user_comments (user_id, created_at),
+    INDEX idx_comment_media_url (media_url(255))
 );
 
 -- Table: Likes
@@ -171,7 +247,7 @@ CREATE TABLE likes (
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     
     UNIQUE KEY unique_like (user_id, target_type, target_id),
-    INDEX idx_target (target_type, target_id),
+    INDEX idx_target_likers (target_type, target_id, created_at, id, user_id), -- Covering index for liker lists
     INDEX idx_user_likes (user_id, created_at)
 );
 
@@ -211,6 +287,22 @@ CREATE TABLE friendships (
     INDEX idx_pending_requests (friend_id, status, created_at)
 );
 
+-- Table: Home Timelines (materialized newsfeed, fan-out-on-write)
+CREATE TABLE home_timelines (
+    id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    user_id BIGINT NOT NULL,
+    post_id BIGINT NOT NULL,
+    author_id BIGINT NOT NULL,
+    created_at DATETIME NOT NULL, -- Copy of posts.created_at
+    
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (post_id) REFERENCES posts(id) ON DELETE CASCADE,
+    
+    UNIQUE KEY unique_timeline_entry (user_id, post_id),
+    INDEX idx_home_timeline (user_id, created_at, post_id),
+    INDEX idx_timeline_author (user_id, author_id)
+);
+
 -- Table: User Blocks
 CREATE TABLE user_blocks (
     id BIGINT PRIMARY KEY AUTO_INCREMENT,
@@ -468,13 +560,36 @@ CREATE TABLE notifications (
     related_id BIGINT, -- post_id, user_id, etc.
     related_type VARCHAR(50),
     
+    -- Aggregation ("A and 24 others liked your post"): one row per (user, type, target, window)
+    target_id BIGINT, -- e.g. the liked post
+    target_type VARCHAR(50),
+    actor_count INT DEFAULT 1,
+    actor_ids JSON, -- Latest actors first
+    group_key VARCHAR(100), -- '<type>:<target_type>:<target_id>:<window>', NULL if not aggregated
+    
     is_read BOOLEAN DEFAULT FALSE,
     
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP, -- Latest activity (inbox order)
     
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     
-    INDEX idx_user_notifications (user_id, is_read, created_at)
+    UNIQUE KEY uq_notification_group (user_id, group_key),
+    INDEX idx_user_notifications (user_id, is_read, created_at),
+    INDEX idx_user_notifications_updated (user_id, updated_at)
+);
+
+-- Table: Notification Actors (distinct actors of an aggregated notification)
+CREATE TABLE notification_actors (
+    id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    notification_id BIGINT NOT NULL,
+    actor_id BIGINT NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    
+    FOREIGN KEY (notification_id) REFERENCES notifications(id) ON DELETE CASCADE,
+    FOREIGN KEY (actor_id) REFERENCES users(id) ON DELETE CASCADE,
+    
+    UNIQUE KEY unique_notification_actor (notification_id, actor_id)
 );
 
 -- ============================================